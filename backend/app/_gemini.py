@@ -0,0 +1,78 @@
+# backend/app/_gemini.py
+"""
+Shared google-genai SDK import and client factory.
+All Gemini callers (chat, image parsing, hybrid vision) share one client,
+and with it one HTTP connection pool. The async side of a client is bound to
+the event loop it first runs on, so code driving its own loop needs a client
+from new_client().
+"""
+import os
+import threading
+from typing import Optional
+
+try:
+    from google import genai
+    from google.genai import types
+    GEMINI_AVAILABLE = True
+except Exception:
+    genai = None
+    types = None
+    GEMINI_AVAILABLE = False
+
+_CLIENT: Optional["genai.Client"] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+# Connection pool shared by concurrent Gemini calls
+_MAX_CONNECTIONS = int(os.environ.get("GEMINI_MAX_CONNECTIONS", "50"))
+_MAX_KEEPALIVE = int(os.environ.get("GEMINI_MAX_KEEPALIVE", "20"))
+
+# Exponential backoff for rate limits and transient server errors
+_RETRY_ATTEMPTS = int(os.environ.get("GEMINI_RETRY_ATTEMPTS", "3"))
+_RETRY_STATUS_CODES = [408, 429, 500, 502, 503, 504]
+
+
+def _http_options() -> "types.HttpOptions":
+    """Keep-alive transport and retry settings; HTTP/2 multiplexing is used when `h2` is installed"""
+    import httpx
+
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+
+    transport_args = {
+        "http2": http2,
+        "limits": httpx.Limits(
+            max_connections=_MAX_CONNECTIONS,
+            max_keepalive_connections=_MAX_KEEPALIVE
+        ),
+    }
+    options = {"client_args": transport_args, "async_client_args": dict(transport_args)}
+
+    # Older SDK releases have no retry support; calls are then single-shot
+    if _RETRY_ATTEMPTS > 1 and hasattr(types, "HttpRetryOptions"):
+        options["retry_options"] = types.HttpRetryOptions(
+            attempts=_RETRY_ATTEMPTS,
+            initial_delay=0.5,
+            max_delay=8.0,
+            exp_base=2.0,
+            http_status_codes=_RETRY_STATUS_CODES
+        )
+    return types.HttpOptions(**options)
+
+
+def new_client() -> "genai.Client":
+    """Create a separate Gemini client with the shared transport settings."""
+    return genai.Client(http_options=_http_options())
+
+
+def get_client() -> "genai.Client":
+    """Return the process-wide Gemini client, creating it on first use."""
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                _CLIENT = new_client()
+    return _CLIENT
@@ -4,40 +4,81 @@ Proxy to call Gemini Text model. Sends a prompt including circuit context and re
 Uses google-genai SDK: pip install google-genai
 """
 import os
-from typing import Dict, Any
+import json
+import hashlib
+from typing import Any, Iterator, Mapping
 
+from ._gemini import genai, get_client
+
+# orjson is optional - fall back to compact stdlib json
 try:
-    from google import genai
-except Exception:
-    genai = None
+    import orjson
+
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+except ImportError:
+    def _json_dumps(obj: Any) -> str:
+        return json.dumps(obj, separators=(',', ':'))
 
 # Fixed security issue - use proper environment variable
 API_KEY = os.environ.get("GEMINI_API_KEY")
 
+# Static prompt pieces - only the context and question vary per call
+_PROMPT_PREFIX = "You are an expert electronics engineer. Given the following circuit context:\n"
+_PROMPT_MIDDLE = "\n\nAnswer the question clearly and concisely:\n"
+_PROMPT_SUFFIX = "\n\nExplain your reasoning briefly and provide numeric values if simulation data is available."
+
+
+def _context_text(context: Mapping[str, Any]) -> str:
+    """The part of the context that goes into the prompt: netlist, else parsed JSON"""
+    if context.get('netlist'):
+        return 'SPICE netlist:\n' + context['netlist']
+    if context.get('parsed_json'):
+        return 'Parsed JSON: ' + _json_dumps(context['parsed_json'])
+    if context.get('parsed'):
+        return 'Parsed JSON: ' + _json_dumps(context['parsed'])
+    return ''
+
+
+def _build_prompt(question: str, context: Mapping[str, Any]) -> str:
+    """Build a concise prompt including the netlist or parsed JSON as context"""
+    return "".join((_PROMPT_PREFIX, _context_text(context), _PROMPT_MIDDLE, question, _PROMPT_SUFFIX))
+
+
+def answer_cache_key(question: str, context: Mapping[str, Any]) -> str:
+    """Cache key for an answer.
+
+    Questions that differ only in case, spacing or trailing punctuation share a
+    key, and only the context that reaches the prompt is hashed.
+    """
+    normalized = " ".join(question.lower().split()).rstrip("?!. ")
+    payload = normalized + "\0" + _context_text(context)
+    return "chat:" + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+MOCK_PREFIX = "[MOCK]"
+
+
+def is_cacheable_answer(reply: str) -> bool:
+    """Mock and empty replies stand in for a real answer and must not be cached"""
+    return bool(reply) and not reply.startswith(MOCK_PREFIX)
+
 
-def ask_gemini_text(question: str, context: Dict[str, Any]) -> str:
+def _mock_answer(question: str, context: Mapping[str, Any]) -> str:
+    return f"{MOCK_PREFIX} I received your question: '{question}'. Context keys: {list(context.keys())[:5]}"
+
+
+def ask_gemini_text(question: str, context: Mapping[str, Any]) -> str:
     """Ask Gemini a question with optional context (netlist or parsed JSON).
 
     Returns the model's textual answer.
     Falls back to a mock if GEMINI_API_KEY or SDK is missing.
     """
     if not API_KEY or genai is None:
-        return f"[MOCK] I received your question: '{question}'. Context keys: {list(context.keys())[:5]}"
-
-    client = genai.Client()
-
-    # Build a concise prompt including the netlist or parsed JSON as context
-    ctx_text = ''
-    if context.get('netlist'):
-        ctx_text = f"SPICE netlist:\n{context['netlist']}"
-    elif context.get('parsed_json'):
-        import json
-        ctx_text = 'Parsed JSON: ' + json.dumps(context['parsed_json'])
-    elif context.get('parsed'):
-        import json
-        ctx_text = 'Parsed JSON: ' + json.dumps(context['parsed'])
+        return _mock_answer(question, context)
 
-    full_prompt = f"You are an expert electronics engineer. Given the following circuit context:\n{ctx_text}\n\nAnswer the question clearly and concisely:\n{question}\n\nExplain your reasoning briefly and provide numeric values if simulation data is available."
+    client = get_client()
+    full_prompt = _build_prompt(question, context)
 
     try:
         response = client.models.generate_content(
@@ -50,3 +91,27 @@ def ask_gemini_text(question: str, context: Dict[str, Any]) -> str:
         return text
     except Exception as e:
         raise RuntimeError(f"Gemini Text call failed: {e}")
+
+
+def ask_gemini_text_stream(question: str, context: Mapping[str, Any]) -> Iterator[str]:
+    """Streaming variant of ask_gemini_text - yields text chunks as they arrive."""
+    if not API_KEY or genai is None:
+        yield _mock_answer(question, context)
+        return
+
+    client = get_client()
+    full_prompt = _build_prompt(question, context)
+
+    try:
+        for chunk in client.models.generate_content_stream(
+            model='gemini-2.5-flash',
+            contents=[full_prompt]
+        ):
+            text = chunk.text
+            if not text:
+                continue
+            if isinstance(text, (bytes, bytearray)):
+                text = text.decode('utf-8')
+            yield text
+    except Exception as e:
+        raise RuntimeError(f"Gemini Text call failed: {e}")
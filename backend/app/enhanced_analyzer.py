@@ -5,9 +5,133 @@ Provides detailed circuit analysis, component verification, and design recommend
 """
 
 import json
+import re
+from collections import Counter
+from types import MappingProxyType
 from typing import Dict, Any, List, Tuple, Optional
 from dataclasses import dataclass
+from functools import lru_cache
 from enum import Enum
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in so kernels still run as plain Python"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# Number, optional SI prefix ("meg" must win over "m"), optional unit name
+_VALUE_RE = re.compile(
+    r'^\s*([+-]?\d*\.?\d+(?:[eE][+-]?\d+)?)\s*(meg|[pnuµmkg])?\s*'
+    r'(?:ohms?|Ω|farads?|f|henr(?:y|ies)|h)?\s*$',
+    re.IGNORECASE
+)
+
+_VALUE_MULTIPLIERS = {
+    None: 1.0, 'p': 1e-12, 'n': 1e-9, 'u': 1e-6, 'µ': 1e-6,
+    'm': 1e-3, 'k': 1e3, 'meg': 1e6, 'g': 1e9
+}
+
+
+@lru_cache(maxsize=2048)
+def _parse_value(value_str: str) -> float:
+    """Parse a value like "10k" or "100nF"; the same strings recur across circuits"""
+    match = _VALUE_RE.match(value_str)
+    if not match:
+        raise ValueError(value_str)
+    
+    suffix = match.group(2)
+    return float(match.group(1)) * _VALUE_MULTIPLIERS[suffix.lower() if suffix else None]
+
+# Type codes / flags for the batched value validation kernel
+_TYPE_CODES = {"resistor": 0, "capacitor": 1}
+_TYPE_UNCHECKED = -1
+_FLAG_OK = 0
+_FLAG_UNUSUAL = 1
+_FLAG_UNPARSEABLE = 2
+
+
+@njit(cache=True)
+def _flag_unusual_values(type_codes, values, flags):
+    """Mark values outside the typical range for their component type"""
+    for i in range(type_codes.shape[0]):
+        t = type_codes[i]
+        v = values[i]
+        if t == 0:
+            if v < 1.0 or v > 1e7:
+                flags[i] = 1
+        elif t == 1:
+            if v < 1e-12 or v > 1e-2:
+                flags[i] = 1
+
+# Component validation rules (read-only, shared by all analyzer instances)
+_COMPONENT_RULES = MappingProxyType({
+    "resistor": MappingProxyType({
+        "typical_values": (1, 10, 100, 1000, 10000, 100000),  # ohms
+        "power_ratings": (0.125, 0.25, 0.5, 1.0, 2.0),  # watts
+        "tolerance": (0.01, 0.05, 0.1, 0.2),  # percentage
+        "applications": ("current limiting", "voltage dividing", "pull-up/pull-down")
+    }),
+    "capacitor": MappingProxyType({
+        "typical_values": (1e-12, 1e-9, 1e-6, 1e-3),  # farads
+        "voltage_ratings": (6.3, 10, 16, 25, 50, 100, 200, 400),  # volts
+        "types": ("ceramic", "electrolytic", "tantalum", "film"),
+        "applications": ("filtering", "coupling", "timing", "energy storage")
+    }),
+    "inductor": MappingProxyType({
+        "typical_values": (1e-6, 1e-3, 1e-2, 1e-1),  # henries
+        "current_ratings": (0.1, 0.5, 1.0, 2.0, 5.0),  # amperes
+        "applications": ("filtering", "energy storage", "impedance matching")
+    }),
+    "diode": MappingProxyType({
+        "forward_voltage": (0.3, 0.7, 1.2),  # volts
+        "current_ratings": (0.1, 1.0, 3.0, 10.0),  # amperes
+        "applications": ("rectification", "protection", "voltage regulation")
+    })
+})
+
+# Circuit pattern recognition rules
+_CIRCUIT_PATTERNS = MappingProxyType({
+    "voltage_divider": MappingProxyType({
+        "components": ("resistor", "resistor"),
+        "connections": "series",
+        "purpose": "Divide input voltage proportionally",
+        "key_formula": "Vout = Vin * (R2 / (R1 + R2))"
+    }),
+    "rc_filter": MappingProxyType({
+        "components": ("resistor", "capacitor"),
+        "connections": "series",
+        "purpose": "Filter frequencies above/below cutoff",
+        "key_formula": "fc = 1 / (2 * π * R * C)"
+    }),
+    "amplifier": MappingProxyType({
+        "components": ("transistor", "resistor"),
+        "minimum_components": 3,
+        "purpose": "Amplify input signal",
+        "key_parameters": ("gain", "bandwidth", "input_impedance")
+    })
+})
+
+# Per-type component recommendations
+_TYPE_RECOMMENDATIONS = {
+    "resistor": ("Consider using standard E24 series values",),
+    "capacitor": (
+        "Verify voltage rating exceeds circuit maximum",
+        "Consider temperature coefficient for precision applications",
+    ),
+}
+
+_GENERAL_RECOMMENDATIONS = (
+    "Verify component specifications match application requirements",
+    "Consider component tolerances in performance calculations",
+    "Add test points for debugging and measurement",
+)
 
 class CircuitType(Enum):
     VOLTAGE_DIVIDER = "voltage_divider"
@@ -19,7 +143,7 @@ class CircuitType(Enum):
     MOTOR_DRIVER = "motor_driver"
     UNKNOWN = "unknown"
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ComponentAnalysis:
     component_id: str
     type: str
@@ -29,7 +153,7 @@ class ComponentAnalysis:
     issues: List[str]
     recommendations: List[str]
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CircuitAnalysis:
     circuit_type: CircuitType
     purpose: str
@@ -44,58 +168,8 @@ class EnhancedCircuitAnalyzer:
     """Professional circuit analysis with domain knowledge"""
     
     def __init__(self):
-        self.component_rules = self._initialize_component_rules()
-        self.circuit_patterns = self._initialize_circuit_patterns()
-    
-    def _initialize_component_rules(self) -> Dict[str, Dict]:
-        """Initialize component validation rules"""
-        return {
-            "resistor": {
-                "typical_values": [1, 10, 100, 1000, 10000, 100000],  # ohms
-                "power_ratings": [0.125, 0.25, 0.5, 1.0, 2.0],  # watts
-                "tolerance": [0.01, 0.05, 0.1, 0.2],  # percentage
-                "applications": ["current limiting", "voltage dividing", "pull-up/pull-down"]
-            },
-            "capacitor": {
-                "typical_values": [1e-12, 1e-9, 1e-6, 1e-3],  # farads
-                "voltage_ratings": [6.3, 10, 16, 25, 50, 100, 200, 400],  # volts
-                "types": ["ceramic", "electrolytic", "tantalum", "film"],
-                "applications": ["filtering", "coupling", "timing", "energy storage"]
-            },
-            "inductor": {
-                "typical_values": [1e-6, 1e-3, 1e-2, 1e-1],  # henries
-                "current_ratings": [0.1, 0.5, 1.0, 2.0, 5.0],  # amperes
-                "applications": ["filtering", "energy storage", "impedance matching"]
-            },
-            "diode": {
-                "forward_voltage": [0.3, 0.7, 1.2],  # volts
-                "current_ratings": [0.1, 1.0, 3.0, 10.0],  # amperes
-                "applications": ["rectification", "protection", "voltage regulation"]
-            }
-        }
-    
-    def _initialize_circuit_patterns(self) -> Dict[str, Dict]:
-        """Initialize circuit pattern recognition rules"""
-        return {
-            "voltage_divider": {
-                "components": ["resistor", "resistor"],
-                "connections": "series",
-                "purpose": "Divide input voltage proportionally",
-                "key_formula": "Vout = Vin * (R2 / (R1 + R2))"
-            },
-            "rc_filter": {
-                "components": ["resistor", "capacitor"],
-                "connections": "series",
-                "purpose": "Filter frequencies above/below cutoff",
-                "key_formula": "fc = 1 / (2 * π * R * C)"
-            },
-            "amplifier": {
-                "components": ["transistor", "resistor"],
-                "minimum_components": 3,
-                "purpose": "Amplify input signal",
-                "key_parameters": ["gain", "bandwidth", "input_impedance"]
-            }
-        }
+        self.component_rules = _COMPONENT_RULES
+        self.circuit_patterns = _CIRCUIT_PATTERNS
     
     def analyze_circuit_comprehensive(self, circuit_data: Dict[str, Any]) -> Dict[str, Any]:
         """Perform comprehensive circuit analysis"""
@@ -104,14 +178,19 @@ class EnhancedCircuitAnalyzer:
         nets = circuit_data.get("nets", [])
         wires = circuit_data.get("wires", [])
         
+        if not components:
+            return self._empty_analysis(nets, wires)
+        
         # Step 1: Component Analysis
-        component_analyses = []
-        for comp in components:
-            analysis = self._analyze_component(comp)
-            component_analyses.append(analysis)
+        value_issues = self._validate_component_values(components)
+        component_analyses = [
+            self._analyze_component(comp, issues)
+            for comp, issues in zip(components, value_issues)
+        ]
         
         # Step 2: Circuit Pattern Recognition
-        circuit_analysis = self._identify_circuit_type(components, nets)
+        type_counts = Counter(comp.get("type", "").lower() for comp in components)
+        circuit_analysis = self._identify_circuit_type(components, nets, type_counts)
         
         # Step 3: Connection Analysis
         connection_analysis = self._analyze_connections(components, nets, wires)
@@ -157,34 +236,46 @@ class EnhancedCircuitAnalyzer:
             }
         }
     
-    def _analyze_component(self, component: Dict[str, Any]) -> ComponentAnalysis:
+    def _empty_analysis(self, nets: List[str], wires: List[Dict]) -> Dict[str, Any]:
+        """Canned result for circuits with no detected components"""
+        return {
+            "circuit_analysis": {
+                "type": CircuitType.UNKNOWN.value,
+                "purpose": "No components detected - nothing to analyze",
+                "confidence": 0.0,
+                "expected_behavior": "Unknown - no components detected",
+                "key_components": []
+            },
+            "component_analysis": [],
+            "connection_analysis": self._analyze_connections([], nets, wires),
+            "performance_metrics": {},
+            "design_recommendations": ["No components detected - check image quality"],
+            "overall_confidence": 0.0,
+            "analysis_metadata": {
+                "components_analyzed": 0,
+                "nets_found": len(nets),
+                "wires_detected": len(wires),
+                "analysis_depth": "comprehensive"
+            }
+        }
+    
+    def _analyze_component(self, component: Dict[str, Any],
+                           value_issues: Optional[List[str]] = None) -> ComponentAnalysis:
         """Analyze individual component"""
         comp_type = component.get("type", "unknown").lower()
         comp_id = component.get("id", component.get("name", "unknown"))
         comp_value = component.get("value", "unknown")
         confidence = component.get("confidence", 0.8)
         
-        issues = []
-        recommendations = []
-        
         # Check against component rules
-        if comp_type in self.component_rules:
-            rules = self.component_rules[comp_type]
-            
-            # Value validation (if parseable)
-            if comp_value != "unknown":
-                value_issues = self._validate_component_value(comp_type, comp_value, rules)
-                issues.extend(value_issues)
+        if value_issues is None:
+            value_issues = self._validate_component_values([component])[0]
+        issues = list(value_issues)
         
         # Generate recommendations based on component type
-        if comp_type == "resistor":
-            recommendations.append("Consider using standard E24 series values")
-            if confidence < 0.7:
-                issues.append("Component detection confidence low - verify component type")
-        
-        elif comp_type == "capacitor":
-            recommendations.append("Verify voltage rating exceeds circuit maximum")
-            recommendations.append("Consider temperature coefficient for precision applications")
+        recommendations = list(_TYPE_RECOMMENDATIONS.get(comp_type, ()))
+        if comp_type == "resistor" and confidence < 0.7:
+            issues.append("Component detection confidence low - verify component type")
         
         return ComponentAnalysis(
             component_id=comp_id,
@@ -196,53 +287,54 @@ class EnhancedCircuitAnalyzer:
             recommendations=recommendations
         )
     
-    def _validate_component_value(self, comp_type: str, value_str: str, rules: Dict) -> List[str]:
-        """Validate component value against typical ranges"""
-        issues = []
-        
-        try:
-            # Simple value parsing (would need more sophisticated parsing in production)
-            numeric_value = self._parse_component_value(value_str)
-            
-            if comp_type == "resistor":
-                if numeric_value < 1 or numeric_value > 10e6:
-                    issues.append(f"Unusual resistor value: {value_str}")
-            
-            elif comp_type == "capacitor":
-                if numeric_value < 1e-12 or numeric_value > 1e-2:
-                    issues.append(f"Unusual capacitor value: {value_str}")
-        
-        except ValueError:
-            issues.append(f"Could not parse component value: {value_str}")
+    def _validate_component_values(self, components: List[Dict[str, Any]]) -> List[List[str]]:
+        """Validate component values against typical ranges in one batched pass"""
+        count = len(components)
+        type_codes = np.full(count, _TYPE_UNCHECKED, dtype=np.int8)
+        values = np.full(count, np.nan, dtype=np.float64)
+        flags = np.zeros(count, dtype=np.int8)
+        
+        comp_types = [comp.get("type", "unknown").lower() for comp in components]
+        for i, comp in enumerate(components):
+            comp_type = comp_types[i]
+            value_str = comp.get("value", "unknown")
+            # Only components with rules and a known value are validated
+            if comp_type not in self.component_rules or value_str == "unknown":
+                continue
+            try:
+                values[i] = self._parse_component_value(value_str)
+                type_codes[i] = _TYPE_CODES.get(comp_type, _TYPE_UNCHECKED)
+            except ValueError:
+                flags[i] = _FLAG_UNPARSEABLE
+        
+        _flag_unusual_values(type_codes, values, flags)
+        
+        issues: List[List[str]] = [[] for _ in range(count)]
+        for i in np.flatnonzero(flags):
+            value_str = components[i].get("value", "unknown")
+            if flags[i] == _FLAG_UNPARSEABLE:
+                issues[i].append(f"Could not parse component value: {value_str}")
+            else:
+                issues[i].append(f"Unusual {comp_types[i]} value: {value_str}")
         
         return issues
     
     def _parse_component_value(self, value_str: str) -> float:
         """Parse component value string to numeric value"""
-        # Simplified parser - would need comprehensive implementation
-        value_str = value_str.lower().replace(" ", "")
-        
-        multipliers = {
-            'p': 1e-12, 'n': 1e-9, 'u': 1e-6, 'µ': 1e-6,
-            'm': 1e-3, 'k': 1e3, 'meg': 1e6, 'g': 1e9
-        }
-        
-        for suffix, mult in multipliers.items():
-            if value_str.endswith(suffix):
-                return float(value_str[:-len(suffix)]) * mult
-        
-        # Try direct numeric conversion
-        return float(value_str.rstrip('ohmsfaradhenry'))
+        return _parse_value(value_str)
     
-    def _identify_circuit_type(self, components: List[Dict], nets: List[str]) -> CircuitAnalysis:
+    def _identify_circuit_type(self, components: List[Dict], nets: List[str],
+                               type_counts: Optional[Counter] = None) -> CircuitAnalysis:
         """Identify the type of circuit and its purpose"""
         
-        component_types = [comp.get("type", "").lower() for comp in components]
+        if type_counts is None:
+            type_counts = Counter(comp.get("type", "").lower() for comp in components)
         component_count = len(components)
+        resistor_count = type_counts["resistor"]
         
         # Pattern matching logic
-        if "resistor" in component_types and component_count == 2:
-            if component_types.count("resistor") == 2:
+        if resistor_count and component_count == 2:
+            if resistor_count == 2:
                 return CircuitAnalysis(
                     circuit_type=CircuitType.VOLTAGE_DIVIDER,
                     purpose="Divide input voltage proportionally between two resistors",
@@ -254,7 +346,7 @@ class EnhancedCircuitAnalyzer:
                     performance_metrics={"efficiency": 0.5, "linearity": 1.0}
                 )
         
-        if "resistor" in component_types and "capacitor" in component_types:
+        if resistor_count and type_counts["capacitor"]:
             return CircuitAnalysis(
                 circuit_type=CircuitType.FILTER,
                 purpose="RC filter for frequency response shaping",
@@ -266,7 +358,7 @@ class EnhancedCircuitAnalyzer:
                 performance_metrics={"cutoff_accuracy": 0.8}
             )
         
-        if "transistor" in component_types or "operational_amplifier" in component_types:
+        if type_counts["transistor"] or type_counts["operational_amplifier"]:
             return CircuitAnalysis(
                 circuit_type=CircuitType.AMPLIFIER,
                 purpose="Signal amplification circuit",
@@ -283,7 +375,7 @@ class EnhancedCircuitAnalyzer:
             circuit_type=CircuitType.UNKNOWN,
             purpose="Circuit type not recognized - manual analysis required",
             confidence=0.4,
-            key_components=component_types,
+            key_components=[comp.get("type", "").lower() for comp in components],
             expected_behavior="Unknown - requires expert analysis",
             potential_issues=["Circuit type identification failed"],
             design_recommendations=["Manual circuit analysis recommended"],
@@ -322,28 +414,24 @@ class EnhancedCircuitAnalyzer:
                                 connection_analysis: Dict[str, Any]) -> List[str]:
         """Generate comprehensive design recommendations"""
         
-        recommendations = []
-        
         # Circuit-level recommendations
-        recommendations.extend(circuit_analysis.design_recommendations)
+        recommendations = list(circuit_analysis.design_recommendations)
         
         # Component-level recommendations
-        for comp_analysis in component_analyses:
-            if comp_analysis.confidence < 0.7:
-                recommendations.append(f"Verify {comp_analysis.component_id} detection accuracy")
+        recommendations.extend(
+            f"Verify {comp_analysis.component_id} detection accuracy"
+            for comp_analysis in component_analyses
+            if comp_analysis.confidence < 0.7
+        )
         
         # Connection-level recommendations
         if connection_analysis["connection_confidence"] < 0.8:
             recommendations.append("Review circuit connections for accuracy")
         
         # General recommendations
-        recommendations.extend([
-            "Verify component specifications match application requirements",
-            "Consider component tolerances in performance calculations",
-            "Add test points for debugging and measurement"
-        ])
+        recommendations.extend(_GENERAL_RECOMMENDATIONS)
         
-        return list(set(recommendations))  # Remove duplicates
+        return list(dict.fromkeys(recommendations))  # Remove duplicates, keep order
     
     def _calculate_overall_confidence(self, 
                                     circuit_analysis: CircuitAnalysis,
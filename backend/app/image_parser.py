@@ -3,15 +3,32 @@
 Hybrid Vision Processing - Combines YOLOv8, OpenCV, and Gemini Vision
 Enhanced with professional circuit analysis capabilities
 """
+import io
 import os
 import sys
 import json
+import copy
+import asyncio
+import hashlib
+import threading
+import importlib.util
+import multiprocessing
 import cv2
 import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from statistics import fmean
 from typing import Dict, List, Any, Optional, Tuple
 import logging
 
+logger = logging.getLogger(__name__)
+
+# OpenCV spreads every call across all cores by default; requests (and hybrid pool
+# workers) already run in parallel, so cap it to avoid oversubscribing the CPU
+_OPENCV_THREADS = int(os.environ.get("OPENCV_THREADS", "1"))
+cv2.setNumThreads(_OPENCV_THREADS)
+
 # Add parent directory to path for integrated detector
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -20,202 +37,683 @@ try:
     INTEGRATED_DETECTOR_AVAILABLE = True
 except ImportError:
     INTEGRATED_DETECTOR_AVAILABLE = False
-    logging.warning("⚠️ Integrated circuit detector not available, using fallback")
+    logger.warning("⚠️ Integrated circuit detector not available, using fallback")
 
-# Try to import the new hybrid processor
+# Worker processes for the CPU-bound hybrid (YOLO + OpenCV) pipeline; 0 runs it in a thread
+_VISION_WORKERS = int(os.environ.get("VISION_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Try to import the new hybrid processor. Importing it loads YOLO, so when the
+# pipeline runs in worker processes the parent only checks it is importable
+if _VISION_WORKERS > 0:
+    HYBRID_AVAILABLE = importlib.util.find_spec(".vision_processor", __package__) is not None
+else:
+    try:
+        from . import vision_processor  # noqa: F401
+        HYBRID_AVAILABLE = True
+    except ImportError:
+        HYBRID_AVAILABLE = False
+
+# Pillow is optional (ultralytics pulls it in) - it reads image sizes from the header
 try:
-    from .vision_processor import process_image_hybrid
-    HYBRID_AVAILABLE = True
+    from PIL import Image
 except ImportError:
-    HYBRID_AVAILABLE = False
+    Image = None
 
-# Fallback to original Gemini-only approach
+# orjson is optional - both loaders accept str or bytes
 try:
-    from google import genai
-    from google.genai import types
-    GEMINI_AVAILABLE = True
-except Exception:
-    GEMINI_AVAILABLE = False
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Fallback to original Gemini-only approach
+from ._gemini import GEMINI_AVAILABLE, types, get_client
 
 API_KEY = os.environ.get("GEMINI_API_KEY")
 
+# Upper bound on concurrent per-image Gemini requests
+_GEMINI_CONCURRENCY = int(os.environ.get("GEMINI_CONCURRENCY", "8"))
+
+# Shared integrated detector - model weights are loaded once per process
+_DETECTOR: Optional["IntegratedCircuitDetector"] = None
+_DETECTOR_LOCK = threading.Lock()
+
+# Ultralytics predictors keep per-call state on the model, so inference on the
+# shared detector runs one request at a time
+_DETECTOR_INFERENCE_LOCK = threading.Lock()
+
+
+def get_integrated_detector() -> "IntegratedCircuitDetector":
+    """Return the process-wide IntegratedCircuitDetector, creating it on first use."""
+    global _DETECTOR
+    if _DETECTOR is None:
+        with _DETECTOR_LOCK:
+            if _DETECTOR is None:
+                _DETECTOR = IntegratedCircuitDetector()
+    return _DETECTOR
+
+
+_VISION_POOL: Optional[ProcessPoolExecutor] = None
+_VISION_POOL_LOCK = threading.Lock()
+
+
+def _init_vision_worker() -> None:
+    """Import the hybrid processor once per worker process; its YOLO model loads on import"""
+    from . import vision_processor  # noqa: F401
+
+
+def _process_image_hybrid(image_path: str) -> Dict[str, Any]:
+    """Run the hybrid processor, importing it (and loading YOLO) on first use in this process"""
+    from .vision_processor import process_image_hybrid
+    return process_image_hybrid(image_path)
+
+
+def _get_vision_pool() -> Optional[ProcessPoolExecutor]:
+    global _VISION_POOL
+    if _VISION_WORKERS <= 0:
+        return None
+    if _VISION_POOL is None:
+        with _VISION_POOL_LOCK:
+            if _VISION_POOL is None:
+                # spawn: forking a process that already holds torch/CUDA state is unsafe
+                _VISION_POOL = ProcessPoolExecutor(
+                    max_workers=_VISION_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_vision_worker
+                )
+    return _VISION_POOL
+
+
+_VISION_PROMPT = (
+    "Extract all circuit components and nets from the attached schematic image. "
+    "Return only JSON of the form: "
+    '{"components":[{"type":"Resistor","name":"R1","value":"10k","nodes":["N1","N2"],"confidence":0.95}],'
+    '"nets":["N1","N2","0"],'
+    '"circuit_analysis":{"type":"...","purpose":"...","key_components":["resistor"],"confidence":0.9},'
+    '"recommendations":["..."]}. '
+    "Use node id '0' for ground. Do not add commentary."
+)
+
+# Bump whenever _VISION_PROMPT changes so cached responses are invalidated
+PROMPT_VERSION = "v2"
+
+# LRU cache of parsed Gemini responses, keyed by image content hash
+_VISION_CACHE: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_VISION_CACHE_LOCK = threading.Lock()
+_VISION_CACHE_SIZE = int(os.environ.get("VISION_CACHE_SIZE", "128"))
+
+
+def _vision_cache_key(image_bytes: bytes) -> str:
+    return hashlib.blake2b(image_bytes, digest_size=16).hexdigest() + ":" + PROMPT_VERSION
+
+
+def _vision_cache_get(key: str) -> Optional[Dict[str, Any]]:
+    """Return a copy of the cached response (callers mutate results), or None"""
+    with _VISION_CACHE_LOCK:
+        cached = _VISION_CACHE.get(key)
+        if cached is None:
+            return None
+        _VISION_CACHE.move_to_end(key)
+    return copy.deepcopy(cached)
+
+
+def _vision_cache_put(key: str, parsed: Dict[str, Any]) -> None:
+    if _VISION_CACHE_SIZE <= 0:
+        return
+    entry = copy.deepcopy(parsed)
+    with _VISION_CACHE_LOCK:
+        _VISION_CACHE[key] = entry
+        _VISION_CACHE.move_to_end(key)
+        while len(_VISION_CACHE) > _VISION_CACHE_SIZE:
+            _VISION_CACHE.popitem(last=False)
+
+
+# Leading magic bytes -> MIME type for the formats Gemini accepts
+_IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF8', 'image/gif'),
+)
+
+
+def _sniff_mime(image_bytes: bytes) -> str:
+    """Detect the image MIME type from its header instead of assuming PNG"""
+    for signature, mime_type in _IMAGE_SIGNATURES:
+        if image_bytes.startswith(signature):
+            return mime_type
+    if image_bytes[:4] == b'RIFF' and image_bytes[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'image/png'
+
+
+# Longest edge sent to Gemini; larger images are downscaled before upload
+_MAX_UPLOAD_EDGE = int(os.environ.get("VISION_MAX_EDGE", "1600"))
+
+# PNGs above this size are sent as high-quality JPEG even when not downscaled
+_TRANSCODE_MIN_BYTES = int(os.environ.get("VISION_TRANSCODE_BYTES", str(2 * 1024 * 1024)))
+
+
+# JPEG start-of-frame markers (baseline, progressive, lossless, arithmetic)
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _jpeg_size(image_bytes: bytes) -> Optional[Tuple[int, int]]:
+    """Walk the JPEG segments up to the first SOF marker"""
+    i = 2
+    while i + 9 <= len(image_bytes):
+        if image_bytes[i] != 0xFF:
+            return None
+        marker = image_bytes[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            height = int.from_bytes(image_bytes[i + 5:i + 7], 'big')
+            width = int.from_bytes(image_bytes[i + 7:i + 9], 'big')
+            return width, height
+        i += 2 + int.from_bytes(image_bytes[i + 2:i + 4], 'big')
+    return None
+
+
+def _image_size(image_bytes: bytes, mime_type: str) -> Optional[Tuple[int, int]]:
+    """(width, height) from the image header, or None if it cannot be read without decoding"""
+    if Image is not None:
+        try:
+            with Image.open(io.BytesIO(image_bytes)) as img:
+                return img.size
+        except Exception:
+            return None
+    if mime_type == 'image/png' and image_bytes[12:16] == b'IHDR':
+        return int.from_bytes(image_bytes[16:20], 'big'), int.from_bytes(image_bytes[20:24], 'big')
+    if mime_type == 'image/jpeg':
+        return _jpeg_size(image_bytes)
+    return None
+
+
+def _decode_for_upload(image_bytes: bytes, mime_type: str) -> Optional[np.ndarray]:
+    """Decode to 8-bit BGR, compositing any alpha channel onto white"""
+    # JPEGs have no alpha, and IMREAD_COLOR applies their EXIF orientation
+    flags = cv2.IMREAD_COLOR if mime_type == 'image/jpeg' else cv2.IMREAD_UNCHANGED
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), flags)
+    if image is None:
+        return None
+    if image.dtype == np.uint16:
+        image = (image >> 8).astype(np.uint8)
+    if image.ndim == 3 and image.shape[2] == 4:
+        alpha = image[:, :, 3:].astype(np.float32) * (1 / 255)
+        image = (image[:, :, :3] * alpha + 255 * (1 - alpha)).astype(np.uint8)
+    return image
+
 
-def parse_image_via_gemini_original(image_path: str) -> Dict[str, Any]:
-    """Original Gemini-only approach (fallback)"""
+def _prepare_upload(image_bytes: bytes) -> Tuple[bytes, str]:
+    """Shrink images before upload.
+
+    Oversized images are downscaled to _MAX_UPLOAD_EDGE and re-encoded as WebP;
+    large PNGs within that edge are transcoded to JPEG if that is smaller.
+    The size comes from the header, so images that are sent as-is are never
+    decoded. Returns the bytes to send and their MIME type; anything else (or
+    anything OpenCV cannot decode) is passed through as-is.
+    """
+    mime_type = _sniff_mime(image_bytes)
+    transcode_png = mime_type == 'image/png' and len(image_bytes) > _TRANSCODE_MIN_BYTES
+    size = _image_size(image_bytes, mime_type)
+    if size is not None and max(size) <= _MAX_UPLOAD_EDGE and not transcode_png:
+        return image_bytes, mime_type
+
+    image = _decode_for_upload(image_bytes, mime_type)
+    if image is None:
+        return image_bytes, mime_type
+
+    height, width = image.shape[:2]
+    longest = max(height, width)
+    if longest <= _MAX_UPLOAD_EDGE:
+        if transcode_png:
+            ok, buf = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 92])
+            if ok and buf.nbytes < len(image_bytes):
+                return buf.tobytes(), 'image/jpeg'
+        return image_bytes, mime_type
+
+    scale = _MAX_UPLOAD_EDGE / longest
+    resized = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                         interpolation=cv2.INTER_AREA)
+    ok, buf = cv2.imencode('.webp', resized, [cv2.IMWRITE_WEBP_QUALITY, 85])
+    if not ok:
+        return image_bytes, mime_type
+    return buf.tobytes(), 'image/webp'
+
+
+def _image_part(image_bytes: bytes):
+    upload_bytes, mime_type = _prepare_upload(image_bytes)
+    return types.Part.from_bytes(data=upload_bytes, mime_type=mime_type)
+
+
+def _mock_result(image_path: Optional[str] = None) -> Dict[str, Any]:
+    """Mock response used when Gemini is not configured"""
+    return {
+        "components": [
+            {"type": "VoltageSource", "name": "V1", "value": "12V", "nodes": ["N1", "0"], "confidence": 0.7},
+            {"type": "Resistor", "name": "R1", "value": "10k", "nodes": ["N1", "N2"], "confidence": 0.7},
+            {"type": "Resistor", "name": "R2", "value": "10k", "nodes": ["N2", "0"], "confidence": 0.7},
+        ],
+        "nets": ["N1", "N2", "0"],
+        "circuit_analysis": {
+            "type": "voltage_divider",
+            "purpose": "Mock circuit - no API key available",
+            "key_components": ["voltage_source", "resistors"],
+            "confidence": 0.5
+        },
+        "recommendations": ["Set up GEMINI_API_KEY to enable real analysis"],
+        "fallback_mode": True,
+        "notes": "Mocked: No GEMINI_API_KEY or google-genai SDK available."
+    }
+
+
+def _normalize_vision_result(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """Ensure all components have confidence scores"""
+    for component in parsed.get('components', []):
+        if 'confidence' not in component:
+            component['confidence'] = 0.8
+
+    return parsed
+
+
+def _parse_vision_response(text) -> Dict[str, Any]:
+    """Decode the Gemini JSON reply and fill in missing confidence scores"""
+    return _normalize_vision_result(_json_loads(text))
+
+
+def parse_image_via_gemini_original(image_path: str, image_bytes: Optional[bytes] = None) -> Dict[str, Any]:
+    """Original Gemini-only approach (fallback). Pass `image_bytes` to skip re-reading the file."""
     if not API_KEY or not GEMINI_AVAILABLE:
-        return {
-            "components": [
-                {"type": "VoltageSource", "name": "V1", "value": "12V", "nodes": ["N1", "0"], "confidence": 0.7},
-                {"type": "Resistor", "name": "R1", "value": "10k", "nodes": ["N1", "N2"], "confidence": 0.7},
-                {"type": "Resistor", "name": "R2", "value": "10k", "nodes": ["N2", "0"], "confidence": 0.7},
-            ],
-            "nets": ["N1", "N2", "0"],
-            "circuit_analysis": {
-                "type": "voltage_divider",
-                "purpose": "Mock circuit - no API key available",
-                "key_components": ["voltage_source", "resistors"],
-                "confidence": 0.5
-            },
-            "recommendations": ["Set up GEMINI_API_KEY to enable real analysis"],
-            "fallback_mode": True,
-            "notes": "Mocked: No GEMINI_API_KEY or google-genai SDK available."
-        }
+        return _mock_result(image_path)
 
     try:
-        with open(image_path, 'rb') as f:
-            image_bytes = f.read()
-
-        client = genai.Client()
-        image_part = types.Part.from_bytes(data=image_bytes, mime_type='image/png')
-
-        prompt = """Extract all circuit components and nets from the attached schematic image. 
-        Return only valid JSON with enhanced structure: 
-        {
-          "components": [
-            {"type": "Resistor", "name": "R1", "value": "10k", "nodes": ["N1", "N2"], "confidence": 0.95}
-          ],
-          "nets": ["N1", "N2", "0"],
-          "circuit_analysis": {
-            "type": "circuit_type",
-            "purpose": "brief_description", 
-            "key_components": ["resistor", "capacitor"],
-            "confidence": 0.90
-          },
-          "recommendations": ["suggestion1", "suggestion2"]
-        }
-        Use node id '0' for ground. Do not add commentary."""
+        if image_bytes is None:
+            with open(image_path, 'rb') as f:
+                image_bytes = f.read()
+
+        cache_key = _vision_cache_key(image_bytes)
+        cached = _vision_cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+        client = get_client()
+        image_part = _image_part(image_bytes)
 
         response = client.models.generate_content(
             model='gemini-2.0-flash',
-            contents=[image_part, prompt],
+            contents=[image_part, _VISION_PROMPT],
             config={'response_mime_type': 'application/json'}
         )
 
-        text = response.text
-        if isinstance(text, (bytes, bytearray)):
-            text = text.decode('utf-8')
-
-        parsed = json.loads(text)
-        
-        # Ensure all components have confidence scores
-        for component in parsed.get('components', []):
-            if 'confidence' not in component:
-                component['confidence'] = 0.8
-        
+        parsed = _parse_vision_response(response.text)
+        _vision_cache_put(cache_key, parsed)
         return parsed
         
     except Exception as e:
         raise RuntimeError(f"Gemini Vision call failed: {e}")
 
 
-def parse_image_via_gemini(image_path: str) -> Dict[str, Any]:
-    """Main entry point - uses integrated detector first, then hybrid processor, otherwise falls back"""
+async def parse_image_via_gemini_original_async(image_path: str,
+                                                image_bytes: Optional[bytes] = None) -> Dict[str, Any]:
+    """Async Gemini-only approach - file read and RPC do not block the event loop"""
+    if not API_KEY or not GEMINI_AVAILABLE:
+        return _mock_result(image_path)
+
+    try:
+        if image_bytes is None:
+            image_bytes = await asyncio.to_thread(Path(image_path).read_bytes)
+
+        cache_key = _vision_cache_key(image_bytes)
+        cached = _vision_cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+        client = get_client()
+        image_part = await asyncio.to_thread(_image_part, image_bytes)
+
+        response = await client.aio.models.generate_content(
+            model='gemini-2.0-flash',
+            contents=[image_part, _VISION_PROMPT],
+            config={'response_mime_type': 'application/json'}
+        )
+
+        parsed = _parse_vision_response(response.text)
+        _vision_cache_put(cache_key, parsed)
+        return parsed
+
+    except Exception as e:
+        raise RuntimeError(f"Gemini Vision call failed: {e}")
+
+
+def _gemini_only_metadata(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Tag a Gemini-only result with processing metadata"""
+    result["processing_method"] = "gemini_only"
+    result["features_enabled"] = {
+        "yolo_component_detection": False,
+        "opencv_wire_detection": False,
+        "gemini_analysis": GEMINI_AVAILABLE and API_KEY is not None
+    }
+    return result
+
+
+def _parse_integrated(image_path: str) -> Dict[str, Any]:
+    """Integrated CircuitYOLO detection system"""
+    logger.info("🎯 Using Integrated CircuitYOLO Detection System")
+    
+    detector = get_integrated_detector()
+    
+    # Analyze circuit image
+    with _DETECTOR_INFERENCE_LOCK:
+        result = detector.analyze_circuit_image(image_path)
+    
+    # Convert to expected format for compatibility
+    converted_result = _convert_integrated_format(result)
+    
+    # Add processing metadata
+    converted_result["processing_method"] = "integrated_yolo_ai"
+    converted_result["features_enabled"] = {
+        "yolo_integration": result.get("yolo_available", False),
+        "opencv_detection": True,
+        "pattern_matching": True,
+        "ai_training_pipeline": True,
+        "fallback_system": result.get("integration", {}).get("fallback_active", False)
+    }
+    
+    logger.info("✅ Integrated detection found %d components", len(converted_result.get('components', [])))
+    return converted_result
+
+
+def _hybrid_metadata(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Tag a hybrid pipeline result with processing metadata"""
+    result["processing_method"] = "hybrid"
+    result["features_enabled"] = {
+        "yolo_component_detection": result.get("detection_meta", {}).get("yolo_available", False),
+        "opencv_wire_detection": True,
+        "gemini_analysis": result.get("detection_meta", {}).get("gemini_available", False)
+    }
+    return result
+
+
+def _parse_hybrid(image_path: str) -> Dict[str, Any]:
+    """Hybrid approach (YOLO + OpenCV + Gemini)"""
+    logger.info("🚀 Using hybrid vision processing (YOLO + OpenCV + Gemini)")
+    return _hybrid_metadata(_process_image_hybrid(image_path))
+
+
+async def _parse_hybrid_async(image_path: str) -> Dict[str, Any]:
+    """Hybrid approach on the vision process pool, so YOLO/OpenCV work scales across cores"""
+    pool = _get_vision_pool()
+    if pool is None:
+        return await asyncio.to_thread(_parse_hybrid, image_path)
+
+    logger.info("🚀 Using hybrid vision processing (YOLO + OpenCV + Gemini)")
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(pool, _process_image_hybrid, image_path)
+    return _hybrid_metadata(result)
+
+
+def _parse_gemini_only(image_path: str, image_bytes: Optional[bytes] = None) -> Dict[str, Any]:
+    """Original Gemini-only approach"""
+    logger.info("🔄 Using Gemini-only vision processing")
+    return _gemini_only_metadata(parse_image_via_gemini_original(image_path, image_bytes))
+
+
+# Named parsing strategies, so callers and tests can force a specific pipeline
+STRATEGY_REGISTRY = {
+    "integrated": _parse_integrated,
+    "hybrid": _parse_hybrid,
+    "gemini_only": _parse_gemini_only,
+    "mock": _mock_result,
+}
+
+
+def _get_strategy(strategy: str):
+    try:
+        return STRATEGY_REGISTRY[strategy]
+    except KeyError:
+        raise ValueError(f"Unknown image parsing strategy: {strategy}")
+
+
+def _parse_image_local(image_path: str) -> Optional[Dict[str, Any]]:
+    """Run the local detection pipelines (integrated, then hybrid); None if neither succeeds"""
     
     # Try integrated CircuitYOLO system first
     if INTEGRATED_DETECTOR_AVAILABLE:
         try:
-            print("🎯 Using Integrated CircuitYOLO Detection System")
-            
-            # Initialize integrated detector
-            detector = IntegratedCircuitDetector()
-            
-            # Analyze circuit image
-            result = detector.analyze_circuit_image(image_path)
-            
-            # Convert to expected format for compatibility
-            converted_result = _convert_integrated_format(result)
-            
-            # Add processing metadata
-            converted_result["processing_method"] = "integrated_yolo_ai"
-            converted_result["features_enabled"] = {
-                "yolo_integration": result.get("yolo_available", False),
-                "opencv_detection": True,
-                "pattern_matching": True,
-                "ai_training_pipeline": True,
-                "fallback_system": result.get("integration", {}).get("fallback_active", False)
-            }
-            
-            print(f"✅ Integrated detection found {len(converted_result.get('components', []))} components")
-            return converted_result
-            
+            return _parse_integrated(image_path)
         except Exception as e:
-            print(f"⚠️ Integrated detection failed, trying hybrid: {e}")
+            logger.warning("⚠️ Integrated detection failed, trying hybrid: %s", e)
     
     # Try hybrid approach (YOLO + OpenCV + Gemini)
     if HYBRID_AVAILABLE:
         try:
-            print("🚀 Using hybrid vision processing (YOLO + OpenCV + Gemini)")
-            result = process_image_hybrid(image_path)
-            
-            # Add processing metadata
-            result["processing_method"] = "hybrid"
-            result["features_enabled"] = {
-                "yolo_component_detection": result.get("detection_meta", {}).get("yolo_available", False),
-                "opencv_wire_detection": True,
-                "gemini_analysis": result.get("detection_meta", {}).get("gemini_available", False)
-            }
-            
-            return result
-            
+            return _parse_hybrid(image_path)
         except Exception as e:
-            print(f"⚠️  Hybrid processing failed, falling back to Gemini-only: {e}")
+            logger.warning("⚠️  Hybrid processing failed, falling back to Gemini-only: %s", e)
+
+    return None
+
+
+def parse_image_via_gemini(image_path: str, strategy: Optional[str] = None,
+                           image_bytes: Optional[bytes] = None) -> Dict[str, Any]:
+    """Main entry point - uses integrated detector first, then hybrid processor, otherwise falls back.
+
+    Pass a STRATEGY_REGISTRY key as `strategy` to run one pipeline without fallbacks.
+    Callers that already hold the file contents can pass `image_bytes` so the
+    Gemini path does not read the file again; the local pipelines still use the path.
+    """
+    if strategy == "gemini_only":
+        return _parse_gemini_only(image_path, image_bytes)
+    if strategy is not None:
+        return _get_strategy(strategy)(image_path)
+
+    result = _parse_image_local(image_path)
+    if result is not None:
+        return result
     
     # Fallback to original Gemini-only approach
-    print("🔄 Using Gemini-only vision processing")
-    result = parse_image_via_gemini_original(image_path)
-    result["processing_method"] = "gemini_only"
-    result["features_enabled"] = {
-        "yolo_component_detection": False,
-        "opencv_wire_detection": False,
-        "gemini_analysis": GEMINI_AVAILABLE and API_KEY is not None
-    }
-    
-    return result
+    return _parse_gemini_only(image_path, image_bytes)
+
+
+async def _parse_image_local_async(image_path: str) -> Optional[Dict[str, Any]]:
+    """Async variant of _parse_image_local - hybrid work goes to the process pool"""
+    if INTEGRATED_DETECTOR_AVAILABLE:
+        try:
+            return await asyncio.to_thread(_parse_integrated, image_path)
+        except Exception as e:
+            logger.warning("⚠️ Integrated detection failed, trying hybrid: %s", e)
+
+    if HYBRID_AVAILABLE:
+        try:
+            return await _parse_hybrid_async(image_path)
+        except Exception as e:
+            logger.warning("⚠️  Hybrid processing failed, falling back to Gemini-only: %s", e)
+
+    return None
+
+
+async def parse_image_via_gemini_async(image_path: Optional[str], strategy: Optional[str] = None,
+                                       image_bytes: Optional[bytes] = None) -> Dict[str, Any]:
+    """Async entry point - local pipelines run in a worker thread, Gemini uses the async client"""
+    if strategy == "hybrid":
+        return await _parse_hybrid_async(image_path)
+    if strategy is not None and strategy != "gemini_only":
+        return await asyncio.to_thread(_get_strategy(strategy), image_path)
+
+    # Local pipelines need a file; bytes-only callers go straight to Gemini
+    if strategy is None and image_path is not None:
+        result = await _parse_image_local_async(image_path)
+        if result is not None:
+            return result
+
+    logger.info("🔄 Using Gemini-only vision processing")
+    return _gemini_only_metadata(await parse_image_via_gemini_original_async(image_path, image_bytes))
+
+
+async def parse_images_via_gemini_original_async(image_paths: List[str]) -> List[Dict[str, Any]]:
+    """Gemini-only parsing of several images in a single request.
+
+    All uncached images are sent as parts of one generate_content call and the
+    model is asked for a JSON array with one circuit per image. Falls back to
+    concurrent per-image calls if the batched reply is unusable.
+    """
+    if not image_paths:
+        return []
+    if not API_KEY or not GEMINI_AVAILABLE:
+        return [_mock_result(p) for p in image_paths]
+    if len(image_paths) == 1:
+        return [await parse_image_via_gemini_original_async(image_paths[0])]
+
+    try:
+        images = await asyncio.gather(
+            *(asyncio.to_thread(Path(p).read_bytes) for p in image_paths)
+        )
+    except Exception as e:
+        raise RuntimeError(f"Gemini Vision call failed: {e}")
+
+    cache_keys = [_vision_cache_key(image_bytes) for image_bytes in images]
+    results: List[Optional[Dict[str, Any]]] = [_vision_cache_get(key) for key in cache_keys]
+    pending = [i for i, result in enumerate(results) if result is None]
+    if not pending:
+        return results
+
+    try:
+        parts = list(await asyncio.gather(
+            *(asyncio.to_thread(_image_part, images[i]) for i in pending)
+        ))
+        prompt = (
+            f"For each of the {len(pending)} attached images, in order, return a JSON array "
+            "whose i-th element is the circuit JSON for image i.\n" + _VISION_PROMPT
+        )
+
+        response = await get_client().aio.models.generate_content(
+            model='gemini-2.0-flash',
+            contents=parts + [prompt],
+            config={'response_mime_type': 'application/json'}
+        )
+
+        batch = _json_loads(response.text)
+        if not isinstance(batch, list) or len(batch) != len(pending):
+            raise ValueError("batched reply does not match the number of images")
+
+        for i, parsed in zip(pending, batch):
+            results[i] = _normalize_vision_result(parsed)
+            _vision_cache_put(cache_keys[i], results[i])
+
+    except Exception as e:
+        logger.warning("⚠️  Batched Gemini request failed, parsing images individually: %s", e)
+        limit = asyncio.Semaphore(_GEMINI_CONCURRENCY)
+
+        async def _parse_one(path: str) -> Dict[str, Any]:
+            async with limit:
+                return await parse_image_via_gemini_original_async(path)
+
+        singles = await asyncio.gather(*(_parse_one(image_paths[i]) for i in pending))
+        for i, parsed in zip(pending, singles):
+            results[i] = parsed
+
+    return results
+
+
+async def parse_images_via_gemini_async(image_paths: List[str]) -> List[Dict[str, Any]]:
+    """Parse several images - local pipelines run concurrently, Gemini-only ones share one request"""
+    results = list(await asyncio.gather(
+        *(_parse_image_local_async(p) for p in image_paths)
+    ))
+
+    pending = [i for i, result in enumerate(results) if result is None]
+    if pending:
+        logger.info("🔄 Using Gemini-only vision processing")
+        gemini_results = await parse_images_via_gemini_original_async([image_paths[i] for i in pending])
+        for i, result in zip(pending, gemini_results):
+            results[i] = _gemini_only_metadata(result)
+
+    return results
+
+
+# Integrated detector class -> SPICE component type
+_COMPONENT_TYPE_MAP = {
+    'resistor': 'Resistor',
+    'capacitor-polarized': 'Capacitor',
+    'capacitor-unpolarized': 'Capacitor',
+    'inductor': 'Inductor',
+    'diode': 'Diode',
+    'led': 'LED',
+    'transistor': 'BJT',
+    'integrated_circuit': 'IC',
+    'operational_amplifier': 'OpAmp',
+    'and': 'AND',
+    'or': 'OR',
+    'not': 'NOT',
+    'voltage-dc': 'VoltageSource',
+    'gnd': 'Ground',
+    'unknown_component': 'Unknown'
+}
+
+# Typical values for detected components
+_TYPICAL_VALUES = {
+    'resistor': '10k',
+    'capacitor-polarized': '100uF',
+    'capacitor-unpolarized': '100nF',
+    'inductor': '1mH',
+    'diode': '1N4148',
+    'led': '2V',
+    'transistor': '2N2222',
+    'voltage-dc': '5V',
+    'integrated_circuit': 'IC1'
+}
 
 
 def _convert_integrated_format(integrated_result: Dict[str, Any]) -> Dict[str, Any]:
     """Convert integrated detector format to expected API format"""
     
     components = []
+    append = components.append
+    map_type = _COMPONENT_TYPE_MAP.get
+    typical_value = _TYPICAL_VALUES.get
     
     # Convert detected components
-    for comp in integrated_result.get("components", []):
-        component = {
-            "type": _map_component_type(comp.get("type", "unknown")),
-            "name": comp.get("id", f"C{len(components) + 1}"),
-            "value": _estimate_component_value(comp.get("type", "unknown")),
-            "nodes": [f"N{len(components) * 2 + 1}", f"N{len(components) * 2 + 2}"],
-            "confidence": comp.get("confidence", 0.6),
-            "position": comp.get("center", [0, 0]),
-            "detection_method": comp.get("detection_method", "integrated")
-        }
-        components.append(component)
+    for idx, comp in enumerate(integrated_result.get("components", [])):
+        comp_get = comp.get
+        comp_type = comp_get("type", "unknown")
+        node = idx * 2
+        append({
+            "type": map_type(comp_type, 'Unknown'),
+            "name": comp["id"] if "id" in comp else "C" + str(idx + 1),
+            "value": typical_value(comp_type, '1'),
+            "nodes": ["N" + str(node + 1), "N" + str(node + 2)],
+            "confidence": comp_get("confidence", 0.6),
+            "position": comp_get("center", [0, 0]),
+            "detection_method": comp_get("detection_method", "integrated")
+        })
     
     # Add connections as components if needed
     connections = integrated_result.get("connections", [])
     for i, conn in enumerate(connections[:5]):  # Limit to 5 connections
         if conn.get("type") == "wire":
-            wire_component = {
+            node = i * 2
+            append({
                 "type": "Wire",
-                "name": f"W{i + 1}",
+                "name": "W" + str(i + 1),
                 "value": "0",
-                "nodes": [f"N{i*2 + 1}", f"N{i*2 + 2}"],
+                "nodes": ["N" + str(node + 1), "N" + str(node + 2)],
                 "confidence": conn.get("confidence", 0.8),
                 "length": conn.get("length", 0)
-            }
-            components.append(wire_component)
+            })
     
     # Create analysis summary
     analysis = integrated_result.get("analysis", {})
+    analysis_get = analysis.get
     
     return {
         "components": components,
         "analysis": {
-            "purpose": f"Circuit with {analysis.get('total_components', 0)} components",
-            "key_components": list(analysis.get("component_types", {}).keys()),
+            "purpose": f"Circuit with {analysis_get('total_components', 0)} components",
+            "key_components": [*analysis_get("component_types", {})],
             "confidence": _calculate_average_confidence(components),
-            "detection_quality": analysis.get("detection_quality", "medium"),
-            "processing_time": analysis.get("processing_time", 0)
+            "detection_quality": analysis_get("detection_quality", "medium"),
+            "processing_time": analysis_get("processing_time", 0)
         },
         "recommendations": _generate_recommendations(integrated_result),
         "detection_meta": {
@@ -226,81 +724,39 @@ def _convert_integrated_format(integrated_result: Dict[str, Any]) -> Dict[str, A
     }
 
 
-def _map_component_type(component_type: str) -> str:
-    """Map integrated detector component types to SPICE types"""
-    mapping = {
-        'resistor': 'Resistor',
-        'capacitor-polarized': 'Capacitor',
-        'capacitor-unpolarized': 'Capacitor',
-        'inductor': 'Inductor',
-        'diode': 'Diode',
-        'led': 'LED',
-        'transistor': 'BJT',
-        'integrated_circuit': 'IC',
-        'operational_amplifier': 'OpAmp',
-        'and': 'AND',
-        'or': 'OR',
-        'not': 'NOT',
-        'voltage-dc': 'VoltageSource',
-        'gnd': 'Ground',
-        'unknown_component': 'Unknown'
-    }
-    
-    return mapping.get(component_type, 'Unknown')
-
-
-def _estimate_component_value(component_type: str) -> str:
-    """Estimate typical component values"""
-    value_map = {
-        'resistor': '10k',
-        'capacitor-polarized': '100uF',
-        'capacitor-unpolarized': '100nF',
-        'inductor': '1mH',
-        'diode': '1N4148',
-        'led': '2V',
-        'transistor': '2N2222',
-        'voltage-dc': '5V',
-        'integrated_circuit': 'IC1'
-    }
-    
-    return value_map.get(component_type, '1')
-
-
 def _calculate_average_confidence(components: List[Dict[str, Any]]) -> float:
     """Calculate average confidence across components"""
-    if not components:
-        return 0.0
-    
-    confidences = [comp.get("confidence", 0.0) for comp in components]
-    return sum(confidences) / len(confidences)
+    return fmean(comp.get("confidence", 0.0) for comp in components) if components else 0.0
+
+
+# Detection-quality advice; any other quality level counts as excellent
+_QUALITY_RECOMMENDATIONS = {
+    "low": (
+        "Consider using higher resolution image",
+        "Ensure good lighting and clear component visibility",
+        "Remove shadows and reflections"
+    ),
+    "medium": (
+        "Good detection quality - verify component values",
+        "Check component connections for accuracy"
+    ),
+}
+_HIGH_QUALITY_RECOMMENDATIONS = ("Excellent detection quality - ready for simulation",)
 
 
 def _generate_recommendations(result: Dict[str, Any]) -> List[str]:
     """Generate recommendations based on detection results"""
-    recommendations = []
-    
     analysis = result.get("analysis", {})
     quality = analysis.get("detection_quality", "medium")
+    total_components = analysis.get("total_components", 0)
+    fallback_active = result.get("integration", {}).get("fallback_active")
     
-    if quality == "low":
-        recommendations.extend([
-            "Consider using higher resolution image",
-            "Ensure good lighting and clear component visibility",
-            "Remove shadows and reflections"
-        ])
-    elif quality == "medium":
-        recommendations.extend([
-            "Good detection quality - verify component values",
-            "Check component connections for accuracy"
-        ])
-    else:
-        recommendations.append("Excellent detection quality - ready for simulation")
+    recommendations = list(_QUALITY_RECOMMENDATIONS.get(quality, _HIGH_QUALITY_RECOMMENDATIONS))
     
     # Add YOLO-specific recommendations
-    if result.get("integration", {}).get("fallback_active"):
+    if fallback_active:
         recommendations.append("Consider updating YOLO dependencies for enhanced detection")
     
-    total_components = analysis.get("total_components", 0)
     if total_components == 0:
         recommendations.append("No components detected - check image quality")
     elif total_components > 20:
@@ -1,28 +1,54 @@
 # backend/app/main.py
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 import os
 import sys
 import time
+import hashlib
+import logging
+import importlib.util
+import json
+from collections import ChainMap
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Mapping
 from dotenv import load_dotenv
-from .image_parser import parse_image_via_gemini
+from .image_parser import (
+    parse_image_via_gemini_async,
+    get_integrated_detector,
+    INTEGRATED_DETECTOR_AVAILABLE,
+    HYBRID_AVAILABLE,
+)
 from .netlist_generator import json_to_netlist
-from .simulator import simulate_netlist
-from .chat_proxy import ask_gemini_text
+from .simulator import simulate_netlist_async
+from .chat_proxy import ask_gemini_text, ask_gemini_text_stream, answer_cache_key, is_cacheable_answer
 from .enhanced_analyzer import analyze_circuit_enhanced
+from .schemas import ChatRequest, NetlistResponse, SimulateRequest, SimulationResponse
+from .response_cache import cache_get, cache_put
+from ._gemini import GEMINI_AVAILABLE
 import tempfile
-import shutil
 
-# Add parent directory to path for integrated detector
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+logger = logging.getLogger(__name__)
 
+# orjson is optional - without it responses use Starlette's stdlib encoder
 try:
-    from integrated_circuit_detector import IntegratedCircuitDetector
-    INTEGRATED_DETECTOR_AVAILABLE = True
+    import orjson
+
+    def _json_bytes(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+    class FastJSONResponse(JSONResponse):
+        """JSONResponse rendered with orjson (numpy arrays and scalars included)"""
+
+        def render(self, content: Any) -> bytes:
+            return _json_bytes(content)
 except ImportError:
-    INTEGRATED_DETECTOR_AVAILABLE = False
+    def _json_bytes(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    FastJSONResponse = JSONResponse
 
 # Load environment variables
 load_dotenv()
@@ -30,7 +56,8 @@ load_dotenv()
 app = FastAPI(
     title="CircuitSim AI Backend",
     description="AI-Powered Circuit Simulation with Enhanced Vision & Professional Analysis",
-    version="2.1.0"
+    version="2.1.0",
+    default_response_class=FastJSONResponse
 )
 
 # Enhanced CORS configuration
@@ -43,6 +70,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Bump whenever the parse pipeline or enhanced analysis output changes shape
+ANALYSIS_VERSION = "1"
+
+# Uploads only live for one request and downstream detectors need a path, so
+# keep them on a RAM-backed filesystem when one is available
+_UPLOAD_DIR = os.getenv("UPLOAD_TMPDIR") or ("/dev/shm" if os.access("/dev/shm", os.W_OK) else None)
+
+
+# Without a local detector the upload never needs to touch the filesystem
+_LOCAL_PIPELINES_AVAILABLE = INTEGRATED_DETECTOR_AVAILABLE or HYBRID_AVAILABLE
+
+
+def _sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _is_cacheable_parse(result: Dict[str, Any]) -> bool:
+    """Only full-quality parses are cached; a degraded one would pin an outage to the image for the TTL"""
+    if result.get("fallback_mode") or result.get("fallback") or result.get("source") == "fallback":
+        return False
+    if "error" in result or "error" in result.get("enhanced_analysis", {}):
+        return False
+    features = result.get("features_enabled", {})
+    if features.get("gemini_analysis") is False or features.get("fallback_system"):
+        return False
+    if result.get("processing_method") == "hybrid" and not features.get("yolo_component_detection"):
+        return False
+    if result.get("processing_method") == "integrated_yolo_ai" and not features.get("yolo_integration"):
+        return False
+    return True
+
+
+def _copy_upload(src, dst) -> str:
+    """Copy an upload to disk in 1 MiB chunks and return its SHA-256 hex digest"""
+    digest = hashlib.sha256()
+    while chunk := src.read(1024 * 1024):
+        digest.update(chunk)
+        dst.write(chunk)
+    return digest.hexdigest()
+
 
 @app.post("/api/parse")
 async def parse_image(file: UploadFile = File(...)):
@@ -50,15 +117,30 @@ async def parse_image(file: UploadFile = File(...)):
     start_time = time.time()
     
     try:
-        # Save uploaded file temporarily
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-        contents = await file.read()
-        tmp.write(contents)
-        tmp.flush()
-        tmp.close()
+        tmp_path = None
+        image_bytes = None
+        if _LOCAL_PIPELINES_AVAILABLE:
+            # Local detectors open the image by path: stream the upload to a
+            # (RAM-backed) temp file in 1 MiB chunks, off the event loop
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".png", dir=_UPLOAD_DIR) as tmp:
+                tmp_path = tmp.name
+                digest = await run_in_threadpool(_copy_upload, file.file, tmp)
+        else:
+            # Gemini-only: the bytes go straight to the SDK, no temp file needed
+            image_bytes = await file.read()
+            digest = await run_in_threadpool(_sha256_hex, image_bytes)
+        
+        # Identical uploads skip the whole detection pipeline
+        cache_key = "parse:" + digest + ":" + ANALYSIS_VERSION
+        cached = await cache_get(cache_key)
+        if cached is not None:
+            if tmp_path:
+                os.unlink(tmp_path)
+            cached["processing_time_ms"] = round((time.time() - start_time) * 1000, 2)
+            return FastJSONResponse(cached, headers={"X-Cache": "HIT"})
         
         # Process with enhanced vision system
-        json_out = parse_image_via_gemini(tmp.name)
+        json_out = await parse_image_via_gemini_async(tmp_path, image_bytes=image_bytes)
         
         # Add processing time
         processing_time = round((time.time() - start_time) * 1000, 2)  # ms
@@ -67,63 +149,112 @@ async def parse_image(file: UploadFile = File(...)):
         # Perform enhanced circuit analysis if components detected
         if json_out.get("components"):
             try:
-                enhanced_analysis = analyze_circuit_enhanced(json_out)
+                enhanced_analysis = await run_in_threadpool(analyze_circuit_enhanced, json_out)
                 json_out["enhanced_analysis"] = enhanced_analysis
             except Exception as e:
-                print(f"Enhanced analysis failed: {e}")
+                logger.warning("Enhanced analysis failed: %s", e)
                 json_out["enhanced_analysis"] = {"error": "Analysis failed", "message": str(e)}
         
         # Clean up
-        os.unlink(tmp.name)
+        if tmp_path:
+            os.unlink(tmp_path)
         
-        return JSONResponse(json_out)
+        if _is_cacheable_parse(json_out):
+            # Timing belongs to this request; a HIT stamps its own
+            await cache_put(cache_key, {k: v for k, v in json_out.items() if k != "processing_time_ms"})
+        return FastJSONResponse(json_out, headers={"X-Cache": "MISS"})
         
     except Exception as e:
         # Clean up on error
-        if 'tmp' in locals():
+        if 'tmp_path' in locals() and tmp_path:
             try:
-                os.unlink(tmp.name)
+                os.unlink(tmp_path)
             except:
                 pass
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/netlist_from_json")
+@app.post("/api/netlist_from_json", response_model=NetlistResponse)
 async def netlist_from_json(parsed_json: dict):
     """Convert parsed circuit JSON to SPICE netlist"""
     try:
         netlist_text = json_to_netlist(parsed_json)
         
-        # Calculate some basic metrics
-        lines = netlist_text.split('\n')
-        component_lines = [line for line in lines if line.strip() and not line.startswith('.') and not line.startswith('*')]
-        
+        # Calculate some basic metrics - json_to_netlist emits exactly one line per
+        # component and lower-case dot commands, so no per-line scan or lower() copy
         return {
             "netlist": netlist_text,
             "metrics": {
-                "total_lines": len(lines),
-                "component_count": len(component_lines),
-                "has_analysis": ".op" in netlist_text.lower() or ".tran" in netlist_text.lower()
+                "total_lines": netlist_text.count('\n') + 1,
+                "component_count": len(parsed_json.get("components", [])),
+                "has_analysis": ".op" in netlist_text or ".tran" in netlist_text
             }
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@app.post("/api/simulate")
-async def api_simulate(payload: dict):
+# Simulation results with at least this many samples are streamed
+_STREAM_MIN_POINTS = int(os.getenv("SIM_STREAM_MIN_POINTS", "50000"))
+
+
+def _count_points(results: Any) -> int:
+    """Total samples across the time/frequency axis and every waveform"""
+    if not isinstance(results, dict):
+        return 0
+    total = 0
+    for value in results.values():
+        if isinstance(value, list):
+            total += len(value)
+        elif isinstance(value, dict):
+            total += sum(len(wave) for wave in value.values() if isinstance(wave, list))
+    return total
+
+
+def _in_model_order(model: type, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Order keys as serializing through `model` would: declared fields first, then extras"""
+    ordered = {name: data[name] for name in model.model_fields if name in data}
+    ordered.update((key, value) for key, value in data.items() if key not in ordered)
+    return ordered
+
+
+def _iter_json(obj: Any, depth: int = 2) -> Iterator[bytes]:
+    """Encode a dict as JSON piecewise, descending `depth` levels before encoding values whole"""
+    if depth == 0 or not isinstance(obj, dict):
+        yield _json_bytes(obj)
+        return
+    yield b'{'
+    for i, (key, value) in enumerate(obj.items()):
+        yield (b',' if i else b'') + _json_bytes(str(key)) + b':'
+        yield from _iter_json(value, depth - 1)
+    yield b'}'
+
+
+@app.post("/api/simulate", response_model=SimulationResponse)
+async def api_simulate(payload: SimulateRequest, response: Response):
     """Enhanced simulation with better error handling and metrics"""
     start_time = time.time()
     
     try:
-        netlist = payload.get("netlist")
-        analysis = payload.get("analysis", {"type": "dc"})
+        netlist = payload.netlist
+        analysis = payload.analysis
         
         if not netlist:
             raise HTTPException(status_code=400, detail="No netlist provided")
         
+        # A netlist + analysis pair always simulates to the same result
+        cache_key = "sim:" + hashlib.sha256(
+            (netlist + "\0" + json.dumps(analysis, sort_keys=True)).encode("utf-8")
+        ).hexdigest()
+        result = await cache_get(cache_key)
+        response.headers["X-Cache"] = "HIT" if result is not None else "MISS"
+        
         # Run simulation
-        result = simulate_netlist(netlist, analysis)
+        if result is None:
+            result = await simulate_netlist_async(netlist, analysis)
+            # Mock output (no ngspice) must not outlive the outage that produced it
+            if result.get("status") == "success":
+                await cache_put(cache_key, result)
         
         # Add timing and enhanced metadata
         processing_time = round((time.time() - start_time) * 1000, 2)
@@ -132,39 +263,66 @@ async def api_simulate(payload: dict):
             **result,
             "simulation_metadata": {
                 "processing_time_ms": processing_time,
-                "analysis_type": analysis.get("type", "dc"),
-                "netlist_lines": len(netlist.split('\n')),
+                "analysis_type": str(analysis.get("type", "dc")),
+                "netlist_lines": netlist.count('\n') + 1,
                 "timestamp": time.time()
             }
         }
         
-        return JSONResponse(enhanced_result)
+        # Long transient runs are encoded and sent one waveform at a time
+        if _count_points(result.get("results")) >= _STREAM_MIN_POINTS:
+            return StreamingResponse(
+                _iter_json(_in_model_order(SimulationResponse, enhanced_result)),
+                media_type="application/json",
+                headers={"X-Cache": response.headers["X-Cache"]}
+            )
+        
+        return enhanced_result
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _enhance_chat_context(context: dict) -> Mapping[str, Any]:
+    """Enhance context with circuit analysis if available"""
+    if "enhanced_analysis" not in context:
+        return context
+    
+    # Layer the insights over the request's context instead of copying it
+    analysis = context["enhanced_analysis"]
+    circuit_analysis = analysis.get("circuit_analysis", {})
+    return ChainMap({
+        "circuit_insights": {
+            "circuit_type": circuit_analysis.get("type", "unknown"),
+            "confidence": analysis.get("overall_confidence", 0.5),
+            "key_components": circuit_analysis.get("key_components", [])
+        }
+    }, context)
+
+
 @app.post("/api/chat")
-async def api_chat(payload: dict):
+async def api_chat(payload: ChatRequest, response: Response):
     """Enhanced chat with circuit-aware context"""
     try:
-        question = payload.get("question")
-        context = payload.get("context", {})
+        question = payload.question
+        context = payload.context
         
         if not question:
             raise HTTPException(status_code=400, detail="No question provided")
         
-        # Enhance context with circuit analysis if available
-        enhanced_context = context.copy()
-        if "enhanced_analysis" in context:
-            analysis = context["enhanced_analysis"]
-            enhanced_context["circuit_insights"] = {
-                "circuit_type": analysis.get("circuit_analysis", {}).get("type", "unknown"),
-                "confidence": analysis.get("overall_confidence", 0.5),
-                "key_components": analysis.get("circuit_analysis", {}).get("key_components", [])
-            }
+        enhanced_context = _enhance_chat_context(context)
         
-        reply = ask_gemini_text(question, enhanced_context)
+        # Repeated questions about the same circuit are answered from cache
+        cache_key = answer_cache_key(question, enhanced_context)
+        cached = await cache_get(cache_key)
+        response.headers["X-Cache"] = "HIT" if cached is not None else "MISS"
+        
+        if cached is not None:
+            reply = cached["answer"]
+        else:
+            reply = await run_in_threadpool(ask_gemini_text, question, enhanced_context)
+            if is_cacheable_answer(reply):
+                await cache_put(cache_key, {"answer": reply})
         
         return {
             "answer": reply,
@@ -176,20 +334,33 @@ async def api_chat(payload: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/health")
-async def health_check():
-    """Enhanced health check with system capabilities"""
+@app.post("/api/chat/stream")
+async def api_chat_stream(payload: ChatRequest):
+    """Chat endpoint that streams the answer as plain text chunks"""
+    question = payload.question
+    context = payload.context
     
-    # Check available features
+    if not question:
+        raise HTTPException(status_code=400, detail="No question provided")
+    
+    return StreamingResponse(
+        ask_gemini_text_stream(question, _enhance_chat_context(context)),
+        media_type="text/plain; charset=utf-8"
+    )
+
+
+# Feature probes only depend on installed packages and startup env, so each
+# report is built once per process and reused by every health check. The first
+# build may load the integrated detector, hence the threadpool hop. The system
+# status report also reads the detector's state and is rebuilt after training.
+@lru_cache(maxsize=None)
+def _health_report() -> Dict[str, Any]:
+    """Features and capabilities for /api/health"""
     features = {}
     
-    try:
-        from .vision_processor import YOLO_AVAILABLE, GEMINI_AVAILABLE
-        features["yolo_detection"] = YOLO_AVAILABLE
-        features["gemini_vision"] = GEMINI_AVAILABLE and os.getenv("GEMINI_API_KEY") is not None
-    except:
-        features["yolo_detection"] = False
-        features["gemini_vision"] = os.getenv("GEMINI_API_KEY") is not None
+    # Probe packages rather than importing vision_processor, which loads YOLO
+    features["yolo_detection"] = importlib.util.find_spec("ultralytics") is not None
+    features["gemini_vision"] = GEMINI_AVAILABLE and os.getenv("GEMINI_API_KEY") is not None
     
     # Check OpenCV
     try:
@@ -207,9 +378,6 @@ async def health_check():
         features["spice_simulation"] = False
     
     return {
-        "status": "ok",
-        "timestamp": time.time(),
-        "version": "2.1.0",
         "features": features,
         "capabilities": {
             "image_analysis": features.get("gemini_vision", False) or features.get("yolo_detection", False),
@@ -220,10 +388,16 @@ async def health_check():
     }
 
 
-@app.get("/api/capabilities")
-async def get_capabilities():
-    """Detailed system capabilities report"""
-    
+@app.get("/api/health")
+async def health_check():
+    """Enhanced health check with system capabilities"""
+    report = await run_in_threadpool(_health_report)
+    return {"status": "ok", "timestamp": time.time(), "version": "2.1.0", **report}
+
+
+@lru_cache(maxsize=None)
+def _capabilities_report() -> Dict[str, Any]:
+    """Capability matrix for /api/capabilities"""
     capabilities = {
         "vision_processing": {
             "gemini_vision": False,
@@ -249,15 +423,11 @@ async def get_capabilities():
     }
     
     # Test actual capabilities
-    try:
-        from .vision_processor import YOLO_AVAILABLE, GEMINI_AVAILABLE
-        capabilities["vision_processing"]["yolo_component_detection"] = YOLO_AVAILABLE
-        capabilities["vision_processing"]["gemini_vision"] = GEMINI_AVAILABLE and os.getenv("GEMINI_API_KEY") is not None
-        capabilities["ai_features"]["chat_assistance"] = capabilities["vision_processing"]["gemini_vision"]
-        capabilities["ai_features"]["circuit_explanation"] = capabilities["vision_processing"]["gemini_vision"]
-        capabilities["ai_features"]["troubleshooting"] = capabilities["vision_processing"]["gemini_vision"]
-    except:
-        pass
+    capabilities["vision_processing"]["yolo_component_detection"] = importlib.util.find_spec("ultralytics") is not None
+    capabilities["vision_processing"]["gemini_vision"] = GEMINI_AVAILABLE and os.getenv("GEMINI_API_KEY") is not None
+    capabilities["ai_features"]["chat_assistance"] = capabilities["vision_processing"]["gemini_vision"]
+    capabilities["ai_features"]["circuit_explanation"] = capabilities["vision_processing"]["gemini_vision"]
+    capabilities["ai_features"]["troubleshooting"] = capabilities["vision_processing"]["gemini_vision"]
     
     try:
         import cv2
@@ -274,25 +444,33 @@ async def get_capabilities():
     return capabilities
 
 
-@app.get("/api/system/status")
-async def get_system_status():
-    """Enhanced system status with integrated detection capabilities"""
-    
+@lru_cache(maxsize=None)
+def _capabilities_etag() -> str:
+    """Strong ETag for the capabilities report, which is fixed for the process lifetime"""
+    body = json.dumps(_capabilities_report(), sort_keys=True).encode("utf-8")
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+@app.get("/api/capabilities")
+async def get_capabilities(request: Request):
+    """Detailed system capabilities report"""
+    report = await run_in_threadpool(_capabilities_report)
+    headers = {"ETag": _capabilities_etag(), "Cache-Control": "public, max-age=60"}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(report, headers=headers)
+
+
+@lru_cache(maxsize=None)
+def _system_status_report() -> Dict[str, Any]:
+    """Features and capabilities for /api/system/status"""
     features = {}
     
     # Check Gemini Vision capability
-    try:
-        api_key = os.getenv("GEMINI_API_KEY")
-        features["gemini_vision"] = api_key is not None
-    except:
-        features["gemini_vision"] = False
+    features["gemini_vision"] = os.getenv("GEMINI_API_KEY") is not None
     
-    # Check YOLO capability 
-    try:
-        import ultralytics
-        features["yolo_detection"] = True
-    except:
-        features["yolo_detection"] = False
+    # Check YOLO capability - find_spec avoids importing torch just to answer
+    features["yolo_detection"] = importlib.util.find_spec("ultralytics") is not None
     
     # Check OpenCV processing
     try:
@@ -306,7 +484,7 @@ async def get_system_status():
     
     if INTEGRATED_DETECTOR_AVAILABLE:
         try:
-            detector = IntegratedCircuitDetector()
+            detector = get_integrated_detector()
             system_status = detector.get_system_status()
             features.update({
                 "yolo_integration": system_status.get("yolo_available", False),
@@ -325,9 +503,6 @@ async def get_system_status():
         features["spice_simulation"] = False
     
     return {
-        "status": "ok",
-        "timestamp": time.time(),
-        "version": "2.1.0",
         "features": features,
         "capabilities": {
             "image_analysis": features.get("gemini_vision", False) or features.get("yolo_detection", False) or features.get("integrated_circuit_detector", False),
@@ -339,13 +514,20 @@ async def get_system_status():
     }
 
 
+@app.get("/api/system/status")
+async def get_system_status():
+    """Enhanced system status with integrated detection capabilities"""
+    report = await run_in_threadpool(_system_status_report)
+    return {"status": "ok", "timestamp": time.time(), "version": "2.1.0", **report}
+
+
 @app.get("/api/circuit/components")
 async def get_supported_components():
     """Get list of supported circuit components"""
     
     if INTEGRATED_DETECTOR_AVAILABLE:
         try:
-            detector = IntegratedCircuitDetector()
+            detector = await run_in_threadpool(get_integrated_detector)
             components_info = detector.get_supported_components()
             return {
                 "success": True,
@@ -391,8 +573,11 @@ async def setup_training_environment():
         )
     
     try:
-        detector = IntegratedCircuitDetector()
-        result = detector.setup_training_environment()
+        detector = await run_in_threadpool(get_integrated_detector)
+        # Generates synthetic images on disk - keep it off the event loop
+        result = await run_in_threadpool(detector.setup_training_environment)
+        # The system status report embeds the detector's training/YOLO state
+        _system_status_report.cache_clear()
         
         return {
             "success": result["success"],
@@ -413,4 +598,11 @@ async def setup_training_environment():
 
 
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
+    # uvloop and httptools come with uvicorn[standard]; without them use the pure-Python stack
+    loop = "uvloop" if sys.platform != "win32" and importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    # Several workers spread CPU-bound requests across cores; auto-reload needs a single process
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    logger.info("🚀 Serving with loop=%s http=%s workers=%d", loop, http, workers)
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=workers == 1,
+                workers=workers, loop=loop, http=http)
@@ -2,39 +2,53 @@
 """
 Convert parsed JSON into a SPICE netlist string. Supports basic components and will raise for unknown types.
 """
-from typing import Dict, Any
+from typing import Callable, Dict, Any
 
 def normalize_value(v: str) -> str:
     # minimal normalization: keep units like k, M, m, u, n, p, V
     return v
 
+
+# SPICE: Rname node1 node2 value
+def _fmt_two_terminal(name, nodes, value, c) -> str:
+    return f"{name} {nodes[0]} {nodes[1]} {normalize_value(value)}"
+
+
+# Vname node+ node- DC value
+def _fmt_voltage_source(name, nodes, value, c) -> str:
+    return f"{name} {nodes[0]} {nodes[1]} DC {normalize_value(value)}"
+
+
+def _fmt_diode(name, nodes, value, c) -> str:
+    return f"{name} {nodes[0]} {nodes[1]} {c.get('model','D')}"
+
+
+# Generic BJT mapping (may need model lines)
+# Expect nodes order: collector base emitter
+def _fmt_bjt(name, nodes, value, c) -> str:
+    return f"{name} {nodes[0]} {nodes[1]} {nodes[2]} {c.get('model','QMODEL')}"
+
+
+# Lower-cased component type -> netlist line formatter
+_FORMATTERS: Dict[str, Callable[..., str]] = {
+    "resistor": _fmt_two_terminal, "r": _fmt_two_terminal,
+    "voltagesource": _fmt_voltage_source, "v": _fmt_voltage_source, "voltage": _fmt_voltage_source,
+    "capacitor": _fmt_two_terminal, "c": _fmt_two_terminal,
+    "inductor": _fmt_two_terminal, "l": _fmt_two_terminal,
+    "diode": _fmt_diode,
+    "npn": _fmt_bjt, "pnp": _fmt_bjt, "transistor": _fmt_bjt,
+}
+
+
 def json_to_netlist(parsed_json: Dict[str, Any]) -> str:
     comps = parsed_json.get("components", [])
     lines = [".title CircuitSim-AI Generated"]
     # Map basic components
     for c in comps:
-        t = c.get("type", "").lower()
-        name = c.get("name")
-        nodes = c.get("nodes", [])
-        value = c.get("value", "")
-        if t in ("resistor", "r"):
-            # SPICE: Rname node1 node2 value
-            lines.append(f"{name} {nodes[0]} {nodes[1]} {normalize_value(value)}")
-        elif t in ("voltagesource", "v", "voltage"):
-            # Vname node+ node- DC value
-            lines.append(f"{name} {nodes[0]} {nodes[1]} DC {normalize_value(value)}")
-        elif t in ("capacitor", "c"):
-            lines.append(f"{name} {nodes[0]} {nodes[1]} {normalize_value(value)}")
-        elif t in ("inductor", "l"):
-            lines.append(f"{name} {nodes[0]} {nodes[1]} {normalize_value(value)}")
-        elif t in ("diode",):
-            lines.append(f"{name} {nodes[0]} {nodes[1]} {c.get('model','D')}")
-        elif t in ("npn", "pnp", "transistor"):
-            # Generic BJT mapping (may need model lines)
-            # Expect nodes order: collector base emitter
-            lines.append(f"{name} {nodes[0]} {nodes[1]} {nodes[2]} {c.get('model','QMODEL')}")
-        else:
+        fmt = _FORMATTERS.get(c.get("type", "").lower())
+        if fmt is None:
             raise ValueError(f"Unsupported component type: {c.get('type')}")
+        lines.append(fmt(c.get("name"), c.get("nodes", []), c.get("value", ""), c))
 
     lines.append(".op")
     lines.append(".end")
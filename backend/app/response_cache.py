@@ -0,0 +1,110 @@
+# backend/app/response_cache.py
+"""
+Two-tier cache for API responses.
+An in-process LRU answers repeats on this worker; when REDIS_URL is set and the
+redis package is installed, entries are also shared across workers and restarts.
+"""
+import os
+import copy
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# orjson is optional - both loaders accept str or bytes
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    aioredis = None
+    REDIS_AVAILABLE = False
+
+_LOCAL_CACHE: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_LOCAL_CACHE_LOCK = threading.Lock()
+_LOCAL_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "64"))
+
+_REDIS_URL = os.environ.get("REDIS_URL")
+_REDIS_TTL = int(os.environ.get("REDIS_CACHE_TTL", "86400"))
+_REDIS: Optional["aioredis.Redis"] = None
+_REDIS_LOCK = threading.Lock()
+
+
+def _get_redis() -> Optional["aioredis.Redis"]:
+    global _REDIS
+    if not REDIS_AVAILABLE or not _REDIS_URL:
+        return None
+    if _REDIS is None:
+        with _REDIS_LOCK:
+            if _REDIS is None:
+                _REDIS = aioredis.Redis.from_url(_REDIS_URL)
+    return _REDIS
+
+
+def _local_get(key: str) -> Optional[Dict[str, Any]]:
+    """Return a copy of the cached response (callers mutate results), or None"""
+    with _LOCAL_CACHE_LOCK:
+        cached = _LOCAL_CACHE.get(key)
+        if cached is None:
+            return None
+        _LOCAL_CACHE.move_to_end(key)
+    return copy.deepcopy(cached)
+
+
+def _local_put(key: str, value: Dict[str, Any]) -> None:
+    if _LOCAL_CACHE_SIZE <= 0:
+        return
+    entry = copy.deepcopy(value)
+    with _LOCAL_CACHE_LOCK:
+        _LOCAL_CACHE[key] = entry
+        _LOCAL_CACHE.move_to_end(key)
+        while len(_LOCAL_CACHE) > _LOCAL_CACHE_SIZE:
+            _LOCAL_CACHE.popitem(last=False)
+
+
+async def cache_get(key: str) -> Optional[Dict[str, Any]]:
+    """Look a response up locally, then in Redis; Redis errors count as a miss"""
+    cached = _local_get(key)
+    redis = _get_redis()
+    if cached is not None or redis is None:
+        return cached
+
+    try:
+        raw = await redis.get(key)
+    except Exception as e:
+        logger.warning("⚠️ Redis cache read failed: %s", e)
+        return None
+    if raw is None:
+        return None
+
+    cached = _json_loads(raw)
+    _local_put(key, cached)
+    return cached
+
+
+async def cache_put(key: str, value: Dict[str, Any]) -> None:
+    """Store a response locally and, when configured, in Redis"""
+    _local_put(key, value)
+    redis = _get_redis()
+    if redis is None:
+        return
+
+    try:
+        await redis.set(key, _json_dumps(value), ex=_REDIS_TTL)
+    except Exception as e:
+        logger.warning("⚠️ Redis cache write failed: %s", e)
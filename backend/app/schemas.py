@@ -0,0 +1,52 @@
+# backend/app/schemas.py
+"""
+Request and response models for the stable API endpoints.
+Declaring them lets FastAPI validate and serialize through pydantic-core instead
+of walking plain dicts; response extras are allowed so optional fields pass through.
+Request fields are typed, so a null or mistyped value is rejected with a 422.
+"""
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class SimulateRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    netlist: Optional[str] = None
+    analysis: Dict[str, Any] = Field(default_factory=lambda: {"type": "dc"})
+
+
+class ChatRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    question: Optional[str] = None
+    context: Dict[str, Any] = Field(default_factory=dict)
+
+
+class NetlistMetrics(BaseModel):
+    total_lines: int
+    component_count: int
+    has_analysis: bool
+
+
+class NetlistResponse(BaseModel):
+    netlist: str
+    metrics: NetlistMetrics
+
+
+class SimulationMetadata(BaseModel):
+    processing_time_ms: float
+    analysis_type: str
+    netlist_lines: int
+    timestamp: float
+
+
+class SimulationResponse(BaseModel):
+    """Simulator output; results / message / error vary by status and analysis type"""
+    model_config = ConfigDict(extra="allow")
+
+    status: str
+    type: str
+    netlist: str
+    simulation_metadata: SimulationMetadata
@@ -7,8 +7,12 @@ import tempfile
 import os
 import json
 import re
+import asyncio
+import threading
+import multiprocessing
 import numpy as np
-from typing import Dict, List, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
 
 try:
     from PySpice.Spice.NgSpice.Shared import NgSpiceShared
@@ -18,39 +22,96 @@ try:
 except Exception:
     HAS_PYSPICE = False
 
+# NgSpice runs one shared-library instance per process, so real simulations go to
+# a small process pool instead of the event loop or a shared thread
+_SIM_WORKERS = int(os.environ.get("SIM_WORKERS", str(min(2, os.cpu_count() or 1))))
+_SIM_POOL: Optional[ProcessPoolExecutor] = None
+_SIM_POOL_LOCK = threading.Lock()
+
+
+def _get_sim_pool() -> Optional[ProcessPoolExecutor]:
+    global _SIM_POOL
+    if not HAS_PYSPICE or _SIM_WORKERS <= 0:
+        return None
+    if _SIM_POOL is None:
+        with _SIM_POOL_LOCK:
+            if _SIM_POOL is None:
+                _SIM_POOL = ProcessPoolExecutor(
+                    max_workers=_SIM_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _SIM_POOL
+
+
+# Node voltage lines like "v(n1) = 6.000000e+00"
+_VOLTAGE_RE = re.compile(r'v\(([^)]+)\)\s*=\s*([-+]?[0-9]*\.?[0-9]+(?:[eE][-+]?[0-9]+)?)', re.IGNORECASE)
+
 
 def parse_dc_operating_point(analysis_output: str) -> Dict[str, float]:
     """Parse DC operating point results from NgSpice output."""
-    results = {}
-    
-    # Look for node voltage lines like "v(n1) = 6.000000e+00"
-    voltage_pattern = r'v\(([^)]+)\)\s*=\s*([-+]?[0-9]*\.?[0-9]+(?:[eE][-+]?[0-9]+)?)'
-    matches = re.findall(voltage_pattern, analysis_output, re.IGNORECASE)
-    
-    for node, voltage in matches:
-        results[node.upper()] = float(voltage)
-    
-    return results
+    return {node.upper(): float(voltage) for node, voltage in _VOLTAGE_RE.findall(analysis_output)}
+
+
+def _mock_transient_waveforms() -> Dict[str, List[float]]:
+    """Mock waveforms over a 100ms simulation, built once at import"""
+    time_points = np.linspace(0, 0.1, 100)
+    return {
+        "time": time_points.tolist(),
+        "N1": np.full_like(time_points, 12.0).tolist(),
+        "N2": (6 * (1 - np.exp(-time_points / 0.01))).tolist()
+    }
+
+
+_MOCK_TRANSIENT = _mock_transient_waveforms()
 
 
 def parse_transient_results(analysis_output: str) -> Dict[str, Any]:
     """Parse transient analysis results."""
-    results = {
-        "time": [],
-        "voltages": {},
+    # This is a simplified parser - in practice, you'd need more robust parsing
+    # For now, return mock transient data (fresh lists, callers may mutate them)
+    return {
+        "time": _MOCK_TRANSIENT["time"].copy(),
+        "voltages": {
+            "N1": _MOCK_TRANSIENT["N1"].copy(),
+            "N2": _MOCK_TRANSIENT["N2"].copy()
+        },
         "currents": {}
     }
-    
-    # This is a simplified parser - in practice, you'd need more robust parsing
-    # For now, return mock transient data
-    time_points = np.linspace(0, 0.1, 100)  # 100ms simulation
-    results["time"] = time_points.tolist()
-    
-    # Mock voltage waveforms
-    results["voltages"]["N1"] = (12 * np.ones_like(time_points)).tolist()
-    results["voltages"]["N2"] = (6 * (1 - np.exp(-time_points/0.01))).tolist()
-    
-    return results
+
+
+# The NgSpice shared library is initialised once per process and is not thread-safe
+_NGSPICE: Optional["NgSpiceShared"] = None
+_NGSPICE_LOCK = threading.Lock()
+
+
+def _get_ngspice() -> "NgSpiceShared":
+    """Return this process's NgSpice engine; callers must hold _NGSPICE_LOCK"""
+    global _NGSPICE
+    if _NGSPICE is None:
+        _NGSPICE = NgSpiceShared.new_instance()
+    return _NGSPICE
+
+
+# Vectors that hold the sweep variable rather than a circuit quantity
+_SCALE_VECTORS = ("time", "frequency", "v-sweep")
+
+
+def _read_vectors(ngspice) -> Tuple[Optional[np.ndarray], Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """Read the last plot's vectors straight from NgSpice as (scale, node voltages, branch currents)"""
+    plot = ngspice.plot(None, ngspice.last_plot)
+    scale = None
+    voltages = {}
+    currents = {}
+    for name, vector in plot.items():
+        data = np.asarray(vector.to_waveform())
+        lowered = name.lower()
+        if lowered in _SCALE_VECTORS:
+            scale = data.real
+        elif lowered.endswith("#branch"):
+            currents[name[:-len("#branch")].upper()] = data
+        else:
+            voltages[name.upper()] = data
+    return scale, voltages, currents
 
 
 def simulate_netlist(netlist_text: str, analysis: dict) -> Dict[str, Any]:
@@ -103,31 +164,49 @@ def simulate_netlist(netlist_text: str, analysis: dict) -> Dict[str, Any]:
         
         enhanced_netlist += "\n.end"
         
-        # Create NgSpice instance and run simulation
-        ngspice = NgSpiceShared()
-        
-        # Load and run the netlist
-        ngspice.load_circuit(enhanced_netlist)
-        ngspice.run()
+        # Load and run the netlist on this process's engine, one simulation at a time
+        with _NGSPICE_LOCK:
+            ngspice = _get_ngspice()
+            ngspice.load_circuit(enhanced_netlist)
+            try:
+                ngspice.run()
+                scale, voltages, currents = _read_vectors(ngspice)
+            finally:
+                ngspice.remove_circuit()
+                ngspice.destroy()
         
         # Get results based on analysis type
         if analysis_type == "transient":
-            results = parse_transient_results(str(ngspice))
             return {
                 "status": "success",
                 "type": "transient", 
-                "results": results,
+                "results": {
+                    "time": scale.tolist() if scale is not None else [],
+                    "voltages": {name: data.tolist() for name, data in voltages.items()},
+                    "currents": {name: data.tolist() for name, data in currents.items()}
+                },
+                "netlist": enhanced_netlist
+            }
+        elif analysis_type == "ac":
+            # Magnitudes; complex phasors are not JSON-serializable
+            return {
+                "status": "success",
+                "type": "ac",
+                "results": {
+                    "frequency": scale.tolist() if scale is not None else [],
+                    "voltages": {name: np.abs(data).tolist() for name, data in voltages.items()},
+                    "currents": {name: np.abs(data).tolist() for name, data in currents.items()}
+                },
                 "netlist": enhanced_netlist
             }
         else:
-            # DC operating point
-            results = parse_dc_operating_point(str(ngspice))
+            # DC operating point - one sample per vector
             return {
                 "status": "success",
                 "type": "dc",
                 "results": {
-                    "nodes": results,
-                    "currents": {}  # Would need additional parsing for currents
+                    "nodes": {name: float(data[-1]) for name, data in voltages.items()},
+                    "currents": {name: float(data[-1]) for name, data in currents.items()}
                 },
                 "netlist": enhanced_netlist
             }
@@ -135,8 +214,17 @@ def simulate_netlist(netlist_text: str, analysis: dict) -> Dict[str, Any]:
     except Exception as e:
         return {
             "status": "error",
-            "type": analysis.get("type", "dc"),
+            "type": str(analysis.get("type", "dc")),
             "error": str(e),
             "message": "Simulation failed. Check netlist syntax.",
             "netlist": netlist_text
         }
+
+
+async def simulate_netlist_async(netlist_text: str, analysis: dict) -> Dict[str, Any]:
+    """Run simulate_netlist off the event loop - process pool for NgSpice, thread for the mock"""
+    pool = _get_sim_pool()
+    if pool is None:
+        return await asyncio.to_thread(simulate_netlist, netlist_text, analysis)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, simulate_netlist, netlist_text, analysis)
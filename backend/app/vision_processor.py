@@ -5,9 +5,11 @@ Combines YOLOv8 component detection with Gemini Vision analysis
 """
 import os
 import json
+import asyncio
+import threading
 import cv2
 import numpy as np
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Dict, Any, List, Tuple, Optional, Union
 
 # Try to import YOLOv8, fall back to Gemini-only if unavailable
 try:
@@ -16,17 +18,127 @@ try:
 except ImportError:
     YOLO_AVAILABLE = False
 
-try:
-    from google import genai
-    from google.genai import types
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
+from ._gemini import GEMINI_AVAILABLE, types, get_client, new_client
 
 API_KEY = os.environ.get("GEMINI_API_KEY")
 
+# Long-lived event loop for the async Gemini client: requests for a batch run
+# concurrently and overlap OpenCV wire detection, and pooled connections survive
+# between batches (a fresh asyncio.run() per call would drop them)
+_GEMINI_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_GEMINI_LOOP_LOCK = threading.Lock()
+
+
+def _get_gemini_loop() -> asyncio.AbstractEventLoop:
+    global _GEMINI_LOOP
+    if _GEMINI_LOOP is None:
+        with _GEMINI_LOOP_LOCK:
+            if _GEMINI_LOOP is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="gemini-loop", daemon=True).start()
+                _GEMINI_LOOP = loop
+    return _GEMINI_LOOP
+
+
+# The shared client's aio side may already be bound to the server's event loop,
+# so the Gemini loop gets a client of its own. Only touched from the loop thread.
+_GEMINI_LOOP_CLIENT = None
+
+
+def _get_gemini_loop_client():
+    global _GEMINI_LOOP_CLIENT
+    if _GEMINI_LOOP_CLIENT is None:
+        _GEMINI_LOOP_CLIENT = new_client()
+    return _GEMINI_LOOP_CLIENT
+
+_GEMINI_MODEL = 'gemini-2.0-flash'
+
+_GEMINI_PROMPT = """Analyze this electronic circuit diagram and return a JSON response with the following structure:
+{
+  "components": [
+    {"type": "resistor", "name": "R1", "value": "10k", "nodes": ["N1", "N2"], "confidence": 0.95},
+    {"type": "capacitor", "name": "C1", "value": "100nF", "nodes": ["N2", "0"], "confidence": 0.85}
+  ],
+  "nets": ["N1", "N2", "0"],
+  "circuit_analysis": {
+    "type": "circuit_type_here",
+    "purpose": "brief_description",
+    "key_components": ["component1", "component2"],
+    "confidence": 0.90
+  },
+  "recommendations": [
+    "suggestion1",
+    "suggestion2"
+  ]
+}
+
+Use node '0' for ground connections. Provide reasonable component values where visible.
+"""
+
+# Build a TensorRT INT8 engine next to best.pt on first load (needs a CUDA GPU + tensorrt)
+_YOLO_EXPORT_ENGINE = os.environ.get("YOLO_EXPORT_ENGINE", "0") == "1"
+
+# Largest batch per YOLO call - the exported engine is built for at most this many images
+_YOLO_MAX_BATCH = int(os.environ.get("YOLO_MAX_BATCH", "8"))
+
+
+def _resolve_yolo_weights(pt_path: str) -> Tuple[str, Optional[str]]:
+    """Return (weights path, task) - a sibling .engine when present or exportable, else the .pt"""
+    engine_path = os.path.splitext(pt_path)[0] + ".engine"
+    if os.path.exists(engine_path):
+        return engine_path, "detect"
+    if not _YOLO_EXPORT_ENGINE:
+        return pt_path, None
+
+    # INT8 calibration needs the training dataset description
+    data_path = os.environ.get("YOLO_CALIB_DATA", os.path.join(os.path.dirname(pt_path), "data.yaml"))
+    try:
+        exported = YOLO(pt_path).export(format="engine", int8=True, half=True, dynamic=True,
+                                        batch=_YOLO_MAX_BATCH, data=data_path, workspace=4)
+        print(f"✅ YOLO TensorRT engine exported to: {exported}")
+        return str(exported), "detect"
+    except Exception as e:
+        print(f"⚠️  TensorRT export failed, using PyTorch weights: {e}")
+        return pt_path, None
+
+
+# Dummy forward pass at load time (YOLO_WARMUP=0 skips it, e.g. for quick CLI runs)
+_YOLO_WARMUP = os.environ.get("YOLO_WARMUP", "1") == "1"
+
+# Loaded (and warmed-up) models per weights path: extra VisionProcessor instances
+# in this process share one deserialized engine instead of rebuilding it
+_YOLO_MODELS: Dict[str, Any] = {}
+_YOLO_MODELS_LOCK = threading.Lock()
+
+
+def _load_yolo(pt_path: str):
+    """Return the process-wide YOLO model for these weights, loading it on first use"""
+    key = os.path.abspath(pt_path)
+    model = _YOLO_MODELS.get(key)
+    if model is None:
+        with _YOLO_MODELS_LOCK:
+            model = _YOLO_MODELS.get(key)
+            if model is None:
+                weights, task = _resolve_yolo_weights(pt_path)
+                model = YOLO(weights, task=task)
+                print(f"✅ YOLO model loaded from: {weights}")
+                _warmup_yolo(model)
+                _YOLO_MODELS[key] = model
+    return model
+
+
+def _warmup_yolo(model) -> None:
+    """Run one dummy inference so engine setup/autotuning isn't paid by the first upload"""
+    if not _YOLO_WARMUP:
+        return
+    try:
+        model(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+    except Exception as e:
+        print(f"⚠️  YOLO warm-up failed: {e}")
+
+
 # Component class names from the circuitry dataset
-COMPONENT_CLASSES = [
+COMPONENT_CLASSES = (
     'and', 'antenna', 'capacitor-polarized', 'capacitor-unpolarized', 'crossover', 
     'diac', 'diode', 'diode-light_emitting', 'fuse', 'gnd', 'inductor', 
     'integrated_circuit', 'integrated_cricuit-ne555', 'lamp', 'microphone', 
@@ -36,7 +148,60 @@ COMPONENT_CLASSES = [
     'terminal', 'thyristor', 'transformer', 'transistor', 'transistor-photo', 
     'triac', 'varistor', 'voltage-dc', 'voltage-dc_ac', 'voltage-dc_regulator', 
     'vss', 'xor'
-]
+)
+COMPONENT_CLASSES_UPPER = tuple(name.upper() for name in COMPONENT_CLASSES)
+_UPPER_BY_CLASS = dict(zip(COMPONENT_CLASSES, COMPONENT_CLASSES_UPPER))
+
+# Opt-in OpenCL (T-API): blur, Canny and HoughLinesP run on the GPU via cv2.UMat
+# with a single download of the detected lines; off by default since small
+# schematics are faster on the CPU than the upload/kernel-launch cost
+_USE_OPENCL = os.environ.get("OPENCV_OPENCL", "0") == "1" and cv2.ocl.haveOpenCL()
+if _USE_OPENCL:
+    cv2.ocl.setUseOpenCL(True)
+
+# Schematics rarely need more than ~1000 px on the long side to locate wires;
+# larger images are shrunk before Canny/Hough and lines scaled back (0 disables)
+_WIRE_MAX_EDGE = int(os.environ.get("WIRE_MAX_EDGE", "1024"))
+
+# Pre-Canny blur; WIRE_PREBLUR=0 saves a full-image pass on clean, rendered schematics
+_WIRE_PREBLUR = os.environ.get("WIRE_PREBLUR", "1") == "1"
+
+# Padding around components to avoid detecting component edges as wires
+_BOX_PADDING = 5
+
+
+def _padded_boxes(component_boxes: List[Tuple[float, float, float, float]],
+                  width: int, height: int) -> List[List[int]]:
+    """Pad and clip boxes in one pass; x2/y2 are exclusive slice bounds (the filled rectangle was inclusive)"""
+    boxes = np.asarray(component_boxes, dtype=np.float64).reshape(-1, 4).astype(np.int32)
+    boxes += np.array([-_BOX_PADDING, -_BOX_PADDING, _BOX_PADDING + 1, _BOX_PADDING + 1], dtype=np.int32)
+    np.clip(boxes, 0, [width, height, width, height], out=boxes)
+    return boxes.tolist()
+
+
+_NO_WIRES: Dict[str, np.ndarray] = {
+    "segments": np.empty((0, 4), dtype=np.int32),
+    "length": np.empty(0),
+    "angle": np.empty(0),
+}
+
+
+def _wires_to_dicts(wires: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Materialize wire arrays as JSON-ready dicts, converting each array with one bulk tolist()"""
+    lengths = wires["length"].tolist()
+    return [
+        {
+            "id": f"w{i}",
+            "start_point": [x1, y1],
+            "end_point": [x2, y2],
+            "length": length,
+            "angle": angle,
+            "type": "wire"
+        }
+        for i, (x1, y1, x2, y2), length, angle
+        in zip(range(1, len(lengths) + 1), wires["segments"].tolist(), lengths, wires["angle"].tolist())
+    ]
+
 
 class VisionProcessor:
     def __init__(self):
@@ -55,8 +220,7 @@ class VisionProcessor:
                 
                 for path in yolo_paths:
                     if os.path.exists(path):
-                        self.yolo_model = YOLO(path)
-                        print(f"✅ YOLO model loaded from: {path}")
+                        self.yolo_model = _load_yolo(path)
                         break
                 
                 if not self.yolo_model:
@@ -68,191 +232,252 @@ class VisionProcessor:
         # Initialize Gemini if available
         if GEMINI_AVAILABLE and API_KEY:
             try:
-                self.gemini_client = genai.Client()
+                self.gemini_client = get_client()
                 print("✅ Gemini Vision initialized")
             except Exception as e:
                 print(f"⚠️  Gemini initialization failed: {e}")
 
-    def preprocess_image_for_lines(self, image_path: str) -> Tuple[np.ndarray, np.ndarray]:
-        """Preprocess image for line/wire detection using OpenCV"""
-        image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    def _load_image(self, image_path: str) -> Tuple[Optional[bytes], Optional[np.ndarray]]:
+        """Read an image from disk once - raw bytes for Gemini, a decoded BGR array for YOLO/OpenCV"""
+        try:
+            with open(image_path, 'rb') as f:
+                image_bytes = f.read()
+        except OSError as e:
+            print(f"⚠️  Could not read image {image_path}: {e}")
+            return None, None
+        image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        return image_bytes, image
+
+    def _grayscale(self, image_path: str, image: Optional[np.ndarray] = None) -> np.ndarray:
+        if image is None:
+            image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        elif image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         if image is None:
             raise ValueError(f"Could not load image: {image_path}")
+        return image
+
+    def preprocess_image_for_lines(self, image_path: str,
+                                   image: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Union[np.ndarray, cv2.UMat]]:
+        """Preprocess image for line/wire detection using OpenCV (edges stay a UMat under OpenCL)"""
+        image = self._grayscale(image_path, image)
             
-        # Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(image, (3, 3), 0)
+        if _USE_OPENCL:
+            image_in = cv2.UMat(image)
+        else:
+            image_in = image
+        
+        # Gaussian blur to reduce noise - Canny does no smoothing of its own, so
+        # only clean (rendered) schematics should turn it off
+        if _WIRE_PREBLUR:
+            image_in = cv2.GaussianBlur(image_in, (3, 3), 0)
         
         # Canny edge detection
-        edges = cv2.Canny(blurred, 50, 150)
+        edges = cv2.Canny(image_in, 50, 150)
         
         return image, edges
 
     def create_component_mask(self, image_shape: Tuple[int, int], 
                             component_boxes: List[Tuple[float, float, float, float]]) -> np.ndarray:
         """Create mask to exclude component areas from line detection"""
-        height, width = image_shape
-        mask = np.ones((height, width), dtype=np.uint8) * 255
+        height, width = image_shape[:2]
+        mask = np.full((height, width), 255, dtype=np.uint8)
         
-        for box in component_boxes:
-            x1, y1, x2, y2 = map(int, box)
-            # Add padding around components to avoid detecting component edges as wires
-            padding = 5
-            x1 = max(0, x1 - padding)
-            y1 = max(0, y1 - padding)
-            x2 = min(width, x2 + padding)
-            y2 = min(height, y2 + padding)
-            
-            cv2.rectangle(mask, (x1, y1), (x2, y2), 0, -1)
+        for x1, y1, x2, y2 in _padded_boxes(component_boxes, width, height):
+            mask[y1:y2, x1:x2] = 0
         
         return mask
 
+    def detect_wire_arrays(self, image_path: str,
+                           component_boxes: List[Tuple[float, float, float, float]],
+                           image: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Detect wires as parallel arrays: (N,4) int32 segments plus N lengths and angles"""
+        scale = 1.0
+        image = self._grayscale(image_path, image)
+        
+        # Shrink large images; Hough pixel thresholds shrink with them
+        height, width = image.shape[:2]
+        if _WIRE_MAX_EDGE > 0 and max(height, width) > _WIRE_MAX_EDGE:
+            factor = _WIRE_MAX_EDGE / max(height, width)
+            image = cv2.resize(image, (max(1, round(width * factor)), max(1, round(height * factor))),
+                               interpolation=cv2.INTER_AREA)
+            scale *= factor
+        if scale != 1.0:
+            component_boxes = np.asarray(component_boxes, dtype=np.float64).reshape(-1, 4) * scale
+        
+        image, edges = self.preprocess_image_for_lines(image_path, image)
+        
+        # Exclude component areas by zeroing them in the (freshly allocated)
+        # edge map - same result as AND-ing with create_component_mask
+        height, width = image.shape[:2]
+        for x1, y1, x2, y2 in _padded_boxes(component_boxes, width, height):
+            if _USE_OPENCL:
+                if x2 > x1 and y2 > y1:
+                    cv2.rectangle(edges, (x1, y1), (x2 - 1, y2 - 1), 0, -1)
+            else:
+                edges[y1:y2, x1:x2] = 0
+        
+        # Detect lines using probabilistic Hough transform
+        lines = cv2.HoughLinesP(
+            edges, 
+            rho=1, 
+            theta=np.pi/180, 
+            threshold=max(1, round(50 * scale)),
+            minLineLength=20 * scale,
+            maxLineGap=10 * scale
+        )
+        
+        if isinstance(lines, cv2.UMat):
+            lines = lines.get()
+        if lines is None or lines.size == 0:
+            return _NO_WIRES
+        
+        # Geometry for every segment at once instead of per-line scalar numpy calls
+        segments = lines.reshape(-1, 4)
+        if scale != 1.0:
+            segments = np.rint(segments / scale).astype(np.int32)
+        dx = segments[:, 2] - segments[:, 0]
+        dy = segments[:, 3] - segments[:, 1]
+        return {
+            "segments": segments,
+            "length": np.round(np.hypot(dx, dy), 2),
+            "angle": np.round(np.degrees(np.arctan2(dy, dx)), 2),
+        }
+
     def detect_wires_opencv(self, image_path: str, 
-                          component_boxes: List[Tuple[float, float, float, float]]) -> List[Dict[str, Any]]:
+                          component_boxes: List[Tuple[float, float, float, float]],
+                          image: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
         """Detect wires/lines using OpenCV HoughLinesP"""
         try:
-            image, edges = self.preprocess_image_for_lines(image_path)
-            
-            # Create mask to exclude component areas
-            mask = self.create_component_mask(image.shape, component_boxes)
-            masked_edges = cv2.bitwise_and(edges, mask)
-            
-            # Detect lines using probabilistic Hough transform
-            lines = cv2.HoughLinesP(
-                masked_edges, 
-                rho=1, 
-                theta=np.pi/180, 
-                threshold=50,
-                minLineLength=20,
-                maxLineGap=10
-            )
-            
-            wires = []
-            if lines is not None:
-                for i, line in enumerate(lines):
-                    try:
-                        # Handle different line formats (OpenCV version differences)
-                        if len(line) == 4:
-                            x1, y1, x2, y2 = line
-                        else:
-                            x1, y1, x2, y2 = line[0]
-                    except (ValueError, IndexError) as e:
-                        print(f"Skipping malformed line {i}: {e}")
-                        continue
-                    
-                    # Calculate line properties
-                    length = np.sqrt((x2-x1)**2 + (y2-y1)**2)
-                    angle = np.degrees(np.arctan2(y2-y1, x2-x1))
-                    
-                    wire = {
-                        "id": f"w{i+1}",
-                        "start_point": [int(x1), int(y1)],
-                        "end_point": [int(x2), int(y2)],
-                        "length": round(length, 2),
-                        "angle": round(angle, 2),
-                        "type": "wire"
-                    }
-                    wires.append(wire)
-            
-            return wires
+            return _wires_to_dicts(self.detect_wire_arrays(image_path, component_boxes, image))
             
         except Exception as e:
             print(f"Wire detection failed: {e}")
             return []
 
-    def detect_components_yolo(self, image_path: str) -> List[Dict[str, Any]]:
-        """Detect components using YOLOv8"""
-        if not self.yolo_model:
+    def _components_from_result(self, result) -> List[Dict[str, Any]]:
+        """Convert one ultralytics result into component dicts"""
+        boxes = result.boxes
+        if boxes is None:
             return []
             
-        try:
-            results = self.yolo_model(image_path)
-            components = []
-            
-            if results and len(results) > 0:
-                boxes = results[0].boxes
-                if boxes is not None:
-                    box_coords = boxes.xyxy.cpu().numpy()
-                    class_ids = boxes.cls.cpu().numpy().astype(int)
-                    confidences = boxes.conf.cpu().numpy()
-                    
-                    for i, (box, class_id, conf) in enumerate(zip(box_coords, class_ids, confidences)):
-                        x1, y1, x2, y2 = map(float, box)
-                        
-                        component = {
-                            "id": f"C{i+1}",
-                            "type": COMPONENT_CLASSES[class_id] if class_id < len(COMPONENT_CLASSES) else "unknown",
-                            "class": COMPONENT_CLASSES[class_id] if class_id < len(COMPONENT_CLASSES) else "unknown",
-                            "bbox": [x1, y1, x2, y2],
-                            "confidence": float(conf),
-                            "center": [(x1 + x2) / 2, (y1 + y2) / 2],
-                            "area": (x2 - x1) * (y2 - y1)
-                        }
-                        components.append(component)
-            
-            return components
-            
-        except Exception as e:
-            print(f"YOLO detection failed: {e}")
-            return []
+        # One device->host copy of the xyxy(+track id)+conf+cls tensor, sliced locally
+        data = boxes.data.cpu().numpy().astype(np.float64, copy=False)
+        box_coords = data[:, :4]
+        centers = ((box_coords[:, :2] + box_coords[:, 2:]) / 2).tolist()
+        areas = ((box_coords[:, 2] - box_coords[:, 0]) * (box_coords[:, 3] - box_coords[:, 1])).tolist()
+        class_names = [
+            COMPONENT_CLASSES[class_id] if 0 <= class_id < len(COMPONENT_CLASSES) else "unknown"
+            for class_id in data[:, -1].astype(np.int32).tolist()
+        ]
+        
+        return [
+            {
+                "id": f"C{i}",
+                "type": name,
+                "class": name,
+                "bbox": bbox,
+                "confidence": conf,
+                "center": center,
+                "area": area
+            }
+            for i, bbox, name, conf, center, area in zip(
+                range(1, len(areas) + 1), box_coords.tolist(), class_names,
+                data[:, -2].tolist(), centers, areas)
+        ]
 
-    def analyze_with_gemini(self, image_path: str, yolo_components: List[Dict] = None) -> Dict[str, Any]:
-        """Analyze circuit using Gemini Vision with optional YOLO context"""
-        if not self.gemini_client or not API_KEY:
-            return self._create_fallback_result(yolo_components)
+    def detect_components_yolo_batch(self, images: List[Union[str, np.ndarray]]) -> List[List[Dict[str, Any]]]:
+        """Detect components in several images (paths or BGR arrays) with batched YOLOv8 calls"""
+        if not self.yolo_model or not images:
+            return [[] for _ in images]
         
-        try:
+        detections = []
+        for start in range(0, len(images), _YOLO_MAX_BATCH):
+            chunk = list(images[start:start + _YOLO_MAX_BATCH])
+            try:
+                # ultralytics letterboxes and stacks a list source into one (N,3,H,W) batch,
+                # so preprocessing, the forward pass and NMS are paid once per chunk
+                results = self.yolo_model(chunk, batch=len(chunk))
+                detections.extend(self._components_from_result(result) for result in results)
+                
+            except Exception as e:
+                print(f"YOLO detection failed: {e}")
+                detections.extend([] for _ in chunk)
+        return detections
+
+    def detect_components_yolo(self, image_path: str,
+                               image: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Detect components using YOLOv8"""
+        return self.detect_components_yolo_batch([image_path if image is None else image])[0]
+
+    def _gemini_contents(self, image_path: str, detected_types: Optional[set],
+                         image_bytes: Optional[bytes]) -> list:
+        """Build the image part and prompt, with YOLO context if available"""
+        if image_bytes is None:
             with open(image_path, 'rb') as f:
                 image_bytes = f.read()
-            
-            image_part = types.Part.from_bytes(data=image_bytes, mime_type='image/jpeg')
-            
-            # Enhanced prompt with YOLO context if available
-            context_prompt = ""
-            if yolo_components:
-                detected_types = [comp['type'] for comp in yolo_components]
-                context_prompt = f"\n\nNote: YOLO detection found these components: {', '.join(set(detected_types))}"
-            
-            prompt = f"""Analyze this electronic circuit diagram and return a JSON response with the following structure:
-{{
-  "components": [
-    {{"type": "resistor", "name": "R1", "value": "10k", "nodes": ["N1", "N2"], "confidence": 0.95}},
-    {{"type": "capacitor", "name": "C1", "value": "100nF", "nodes": ["N2", "0"], "confidence": 0.85}}
-  ],
-  "nets": ["N1", "N2", "0"],
-  "circuit_analysis": {{
-    "type": "circuit_type_here",
-    "purpose": "brief_description",
-    "key_components": ["component1", "component2"],
-    "confidence": 0.90
-  }},
-  "recommendations": [
-    "suggestion1",
-    "suggestion2"
-  ]
-}}
+        
+        image_part = types.Part.from_bytes(data=image_bytes, mime_type='image/jpeg')
+        
+        prompt = _GEMINI_PROMPT
+        if detected_types:
+            prompt += f"\n\nNote: YOLO detection found these components: {', '.join(detected_types)}"
+        
+        return [image_part, prompt]
 
-Use node '0' for ground connections. Provide reasonable component values where visible.
-{context_prompt}"""
+    def _merge_gemini_result(self, response_text: str, yolo_components: Optional[List[Dict]],
+                             detected_types: Optional[set]) -> Dict[str, Any]:
+        result = json.loads(response_text)
+        
+        # Merge with YOLO results if available
+        if yolo_components:
+            confidences = np.fromiter((comp['confidence'] for comp in yolo_components),
+                                      dtype=np.float64, count=len(yolo_components))
+            result["yolo_detection"] = {
+                "components_found": len(yolo_components),
+                "confidence_avg": float(confidences.mean()),
+                "types_detected": list(detected_types)
+            }
+        
+        return result
 
+    def analyze_with_gemini(self, image_path: str, yolo_components: List[Dict] = None,
+                            image_bytes: Optional[bytes] = None) -> Dict[str, Any]:
+        """Analyze circuit using Gemini Vision with optional YOLO context"""
+        if not self.gemini_client or not API_KEY:
+            return self._create_fallback_result(yolo_components)
+        
+        try:
+            detected_types = {comp['type'] for comp in yolo_components} if yolo_components else None
             response = self.gemini_client.models.generate_content(
-                model='gemini-2.0-flash',
-                contents=[image_part, prompt],
+                model=_GEMINI_MODEL,
+                contents=self._gemini_contents(image_path, detected_types, image_bytes),
                 config={
                     'response_mime_type': 'application/json'
                 }
             )
+            return self._merge_gemini_result(response.text, yolo_components, detected_types)
             
-            result = json.loads(response.text)
-            
-            # Merge with YOLO results if available
-            if yolo_components:
-                result["yolo_detection"] = {
-                    "components_found": len(yolo_components),
-                    "confidence_avg": np.mean([comp['confidence'] for comp in yolo_components]),
-                    "types_detected": list(set([comp['type'] for comp in yolo_components]))
+        except Exception as e:
+            print(f"Gemini analysis failed: {e}")
+            return self._create_fallback_result(yolo_components)
+
+    async def analyze_with_gemini_async(self, image_path: str, yolo_components: List[Dict] = None,
+                                        image_bytes: Optional[bytes] = None) -> Dict[str, Any]:
+        """Async variant of analyze_with_gemini; runs on the Gemini loop with that loop's client"""
+        if not self.gemini_client or not API_KEY:
+            return self._create_fallback_result(yolo_components)
+        
+        try:
+            detected_types = {comp['type'] for comp in yolo_components} if yolo_components else None
+            response = await _get_gemini_loop_client().aio.models.generate_content(
+                model=_GEMINI_MODEL,
+                contents=self._gemini_contents(image_path, detected_types, image_bytes),
+                config={
+                    'response_mime_type': 'application/json'
                 }
-            
-            return result
+            )
+            return self._merge_gemini_result(response.text, yolo_components, detected_types)
             
         except Exception as e:
             print(f"Gemini analysis failed: {e}")
@@ -261,13 +486,17 @@ Use node '0' for ground connections. Provide reasonable component values where v
     def _create_fallback_result(self, yolo_components: List[Dict] = None) -> Dict[str, Any]:
         """Create fallback result when AI analysis fails"""
         components = []
+        key_components = []
         
         if yolo_components:
             # Convert YOLO components to standard format
             for i, comp in enumerate(yolo_components):
+                comp_type = comp['type']
+                key_components.append(comp_type)
+                upper = _UPPER_BY_CLASS.get(comp_type)
                 components.append({
-                    "type": comp['type'],
-                    "name": f"{comp['type'].upper()}{i+1}",
+                    "type": comp_type,
+                    "name": f"{comp_type.upper() if upper is None else upper}{i+1}",
                     "value": "unknown",
                     "nodes": [f"N{i}", f"N{i+1}"],
                     "confidence": comp['confidence']
@@ -278,6 +507,7 @@ Use node '0' for ground connections. Provide reasonable component values where v
                 {"type": "resistor", "name": "R1", "value": "1k", "nodes": ["N1", "N2"], "confidence": 0.5},
                 {"type": "voltage_source", "name": "V1", "value": "5V", "nodes": ["N1", "0"], "confidence": 0.5}
             ]
+            key_components = ["resistor", "voltage_source"]
         
         return {
             "components": components,
@@ -285,7 +515,7 @@ Use node '0' for ground connections. Provide reasonable component values where v
             "circuit_analysis": {
                 "type": "unknown_circuit",
                 "purpose": "Circuit analysis unavailable - using fallback detection",
-                "key_components": [comp['type'] for comp in components],
+                "key_components": key_components,
                 "confidence": 0.5
             },
             "recommendations": [
@@ -294,36 +524,27 @@ Use node '0' for ground connections. Provide reasonable component values where v
             "fallback_mode": True
         }
 
-    def process_circuit_image(self, image_path: str) -> Dict[str, Any]:
-        """Main processing pipeline - hybrid YOLO + Gemini + OpenCV approach"""
+    def _finish_circuit_image(self, image_path: str, image: Optional[np.ndarray],
+                              yolo_components: List[Dict[str, Any]], gemini_future) -> Dict[str, Any]:
+        """Run wire detection for one image and merge it with the Gemini result"""
         try:
-            print(f"🔍 Processing circuit image: {image_path}")
-            
-            # Step 1: YOLO component detection
-            yolo_components = []
-            if self.yolo_model:
-                yolo_components = self.detect_components_yolo(image_path)
-                print(f"📍 YOLO detected {len(yolo_components)} components")
-            
-            # Step 2: OpenCV wire detection
+            # Step 3: OpenCV wire detection
             component_boxes = [comp['bbox'] for comp in yolo_components] if yolo_components else []
-            wires = self.detect_wires_opencv(image_path, component_boxes)
+            wires = self.detect_wires_opencv(image_path, component_boxes, image)
             print(f"🔗 OpenCV detected {len(wires)} wires")
             
-            # Step 3: Gemini analysis with YOLO context
-            gemini_result = self.analyze_with_gemini(image_path, yolo_components)
+            gemini_result = gemini_future.result()
             
-            # Step 4: Combine all results
-            final_result = {
-                **gemini_result,
-                "wires": wires,
-                "detection_meta": {
-                    "yolo_available": YOLO_AVAILABLE and self.yolo_model is not None,
-                    "gemini_available": GEMINI_AVAILABLE and self.gemini_client is not None,
-                    "yolo_components_count": len(yolo_components),
-                    "opencv_wires_count": len(wires),
-                    "processing_time": "calculated_in_main"
-                }
+            # Step 4: Combine all results - the Gemini/fallback dict is built fresh
+            # per call, so extend it in place rather than copying it
+            final_result = gemini_result
+            final_result["wires"] = wires
+            final_result["detection_meta"] = {
+                "yolo_available": YOLO_AVAILABLE and self.yolo_model is not None,
+                "gemini_available": GEMINI_AVAILABLE and self.gemini_client is not None,
+                "yolo_components_count": len(yolo_components),
+                "opencv_wires_count": len(wires),
+                "processing_time": "calculated_in_main"
             }
             
             print("✅ Circuit processing completed")
@@ -333,9 +554,52 @@ Use node '0' for ground connections. Provide reasonable component values where v
             print(f"❌ Circuit processing failed: {e}")
             return self._create_fallback_result()
 
+    def process_circuit_images(self, image_paths: List[str]) -> List[Dict[str, Any]]:
+        """Batched processing pipeline - one YOLO pass for all images, then Gemini + OpenCV per image"""
+        try:
+            print(f"🔍 Processing {len(image_paths)} circuit image(s)")
+            
+            # Each file is read and decoded once; every stage below reuses these
+            loaded = [self._load_image(path) for path in image_paths]
+            images = [image for _, image in loaded]
+            
+            # Step 1: YOLO component detection for the whole batch
+            batch_components = [[] for _ in image_paths]
+            if self.yolo_model:
+                sources = [path if image is None else image for path, image in zip(image_paths, images)]
+                batch_components = self.detect_components_yolo_batch(sources)
+                print(f"📍 YOLO detected {sum(map(len, batch_components))} components")
+            
+            # Step 2: Gemini analysis with YOLO context - network round-trips, so all
+            # requests run concurrently on the Gemini loop while OpenCV traces wires here
+            loop = _get_gemini_loop()
+            gemini_futures = [
+                asyncio.run_coroutine_threadsafe(
+                    self.analyze_with_gemini_async(path, components, image_bytes), loop)
+                for path, components, (image_bytes, _) in zip(image_paths, batch_components, loaded)
+            ]
+            
+        except Exception as e:
+            print(f"❌ Circuit processing failed: {e}")
+            return [self._create_fallback_result() for _ in image_paths]
+        
+        return [
+            self._finish_circuit_image(path, image, components, future)
+            for path, image, components, future in zip(image_paths, images, batch_components, gemini_futures)
+        ]
+
+    def process_circuit_image(self, image_path: str) -> Dict[str, Any]:
+        """Main processing pipeline - hybrid YOLO + Gemini + OpenCV approach"""
+        return self.process_circuit_images([image_path])[0]
+
 # Global processor instance
 vision_processor = VisionProcessor()
 
 def process_image_hybrid(image_path: str) -> Dict[str, Any]:
     """Public interface for hybrid vision processing"""
-    return vision_processor.process_circuit_image(image_path)
\ No newline at end of file
+    return vision_processor.process_circuit_image(image_path)
+
+
+def process_images_hybrid(image_paths: List[str]) -> List[Dict[str, Any]]:
+    """Public interface for batched hybrid vision processing"""
+    return vision_processor.process_circuit_images(image_paths)
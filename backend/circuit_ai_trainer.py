@@ -6,16 +6,239 @@ Integrates YOLO training with circuit-specific datasets for component detection
 
 import os
 import json
+import importlib.util
 import numpy as np
 import cv2
 from pathlib import Path
 import logging
+import multiprocessing
+from concurrent.futures import (
+    ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+)
 from typing import Dict, List, Any, Tuple
 
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fewer images than this per process don't pay back a spawned worker's startup
+_MIN_IMAGES_PER_PROCESS = 50
+
+# YOLO label row: class_id center_x center_y width height
+_LABEL_FORMAT = "%d %.6f %.6f %.6f %.6f"
+
+# Resistor color bands, indexed per pixel column when blitting
+_RESISTOR_BAND_COLORS = np.array([(255, 0, 0), (255, 255, 0), (0, 255, 0)], dtype=np.uint8)
+
+
+def _fill_rect(img: np.ndarray, x: int, y: int, w: int, h: int, color) -> None:
+    """Same pixels as cv2.rectangle(img, (x, y), (x+w, y+h), color, -1), as one slice store"""
+    img[max(y, 0):y + h + 1, max(x, 0):x + w + 1] = color
+
+def _draw_resistor(img: np.ndarray, x: int, y: int, w: int, h: int):
+    # Draw resistor as rectangle with zigzag
+    cv2.rectangle(img, (x, y), (x+w, y+h), (139, 69, 19), 2)
+    # Add color bands - one blit; shared edge columns take the later band
+    band_width = w // 5
+    if band_width > 0:
+        cols = np.arange(3 * band_width + 1)[:max(0, img.shape[1] - x)]
+        img[y:y+h+1, x:x+len(cols)] = _RESISTOR_BAND_COLORS[np.minimum(cols // band_width, 2)]
+
+
+def _draw_capacitor_polarized(img: np.ndarray, x: int, y: int, w: int, h: int):
+    # Cylindrical capacitor
+    cv2.rectangle(img, (x, y), (x+w, y+h), (0, 0, 0), 2)
+    # Add polarity marking
+    cv2.putText(img, '+', (x+5, y+h-5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+
+
+def _draw_capacitor_ceramic(img: np.ndarray, x: int, y: int, w: int, h: int):
+    # Ceramic capacitor
+    _fill_rect(img, x, y, w, h, (255, 255, 0))
+    cv2.rectangle(img, (x, y), (x+w, y+h), (0, 0, 0), 1)
+
+
+def _draw_inductor(img: np.ndarray, x: int, y: int, w: int, h: int):
+    # Draw coil shape
+    center_x = x + w//2
+    center_y = y + h//2
+    for i in range(3):
+        cv2.circle(img, (center_x - w//4 + i*w//4, center_y), h//4, (150, 75, 0), 2, lineType=cv2.LINE_AA)
+
+
+def _draw_diode(img: np.ndarray, x: int, y: int, w: int, h: int):
+    # Triangle with line
+    cv2.line(img, (x, y+h//2), (x+w//2, y), (0, 0, 0), 2)
+    cv2.line(img, (x+w//2, y), (x+w//2, y+h), (0, 0, 0), 2)
+    cv2.line(img, (x+w//2, y+h), (x, y+h//2), (0, 0, 0), 2)
+    cv2.line(img, (x+w//2, y), (x+w, y+h//2), (0, 0, 0), 2)
+
+
+_LED_COLORS = ((0, 0, 255), (0, 255, 0), (255, 0, 0), (0, 255, 255))
+
+
+def _draw_led(img: np.ndarray, x: int, y: int, w: int, h: int, color: Tuple[int, int, int] = _LED_COLORS[0]):
+    _draw_diode(img, x, y, w, h)
+    # Add LED color
+    cv2.circle(img, (x+w//2, y+h//2), min(w, h)//4, color, -1)
+
+
+def _draw_transistor(img: np.ndarray, x: int, y: int, w: int, h: int):
+    # Simple transistor shape
+    cv2.circle(img, (x+w//2, y+h//2), min(w, h)//2, (0, 0, 0), 2)
+    cv2.line(img, (x, y+h//2), (x+w, y+h//2), (0, 0, 0), 2)
+
+
+def _draw_ic(img: np.ndarray, x: int, y: int, w: int, h: int):
+    # DIP package
+    _fill_rect(img, x, y, w, h, (50, 50, 50))
+    cv2.rectangle(img, (x, y), (x+w, y+h), (0, 0, 0), 2)
+    # Add pins
+    pin_spacing = h // 8
+    for i in range(4):
+        cv2.circle(img, (x, y + pin_spacing * (i+2)), 2, (200, 200, 200), -1)
+        cv2.circle(img, (x+w, y + pin_spacing * (i+2)), 2, (200, 200, 200), -1)
+
+
+def _draw_and_gate(img: np.ndarray, x: int, y: int, w: int, h: int):
+    # AND gate - D shape
+    cv2.ellipse(img, (x+w//2, y+h//2), (w//2, h//2), 0, -90, 90, (0, 0, 0), 2)
+    cv2.line(img, (x, y), (x, y+h), (0, 0, 0), 2)
+
+
+def _draw_or_gate(img: np.ndarray, x: int, y: int, w: int, h: int):
+    # OR gate - curved input
+    cv2.ellipse(img, (x+w//2, y+h//2), (w//2, h//2), 0, 0, 360, (0, 0, 0), 2)
+
+
+def _draw_block(img: np.ndarray, x: int, y: int, w: int, h: int):
+    # Generic gate / default component
+    _fill_rect(img, x, y, w, h, (128, 128, 128))
+    cv2.rectangle(img, (x, y), (x+w, y+h), (0, 0, 0), 2)
+
+
+# Draw-kind id -> drawer; ids come from _draw_kind so the hot loop dispatches on an int
+_DRAWERS = (
+    _draw_resistor, _draw_capacitor_polarized, _draw_capacitor_ceramic, _draw_inductor,
+    _draw_diode, _draw_led, _draw_transistor, _draw_ic,
+    _draw_and_gate, _draw_or_gate, _draw_block,
+)
+(_KIND_RESISTOR, _KIND_CAPACITOR_POLARIZED, _KIND_CAPACITOR_CERAMIC, _KIND_INDUCTOR,
+ _KIND_DIODE, _KIND_LED, _KIND_TRANSISTOR, _KIND_IC,
+ _KIND_AND_GATE, _KIND_OR_GATE, _KIND_BLOCK) = range(len(_DRAWERS))
+
+
+def _draw(kind: int, img: np.ndarray, x: int, y: int, w: int, h: int, color_index: int):
+    """Draw one component; color_index picks the LED colour and is ignored by other kinds"""
+    if kind == _KIND_LED:
+        _draw_led(img, x, y, w, h, _LED_COLORS[color_index])
+    else:
+        _DRAWERS[kind](img, x, y, w, h)
+
+
+def _draw_kind(component_type: str) -> int:
+    """Map a component name to its draw kind (substring rules, first match wins)"""
+    if 'resistor' in component_type:
+        return _KIND_RESISTOR
+    if 'capacitor' in component_type:
+        return _KIND_CAPACITOR_POLARIZED if 'polarized' in component_type else _KIND_CAPACITOR_CERAMIC
+    if 'inductor' in component_type:
+        return _KIND_INDUCTOR
+    if 'diode' in component_type or 'led' in component_type:
+        return _KIND_LED if 'led' in component_type else _KIND_DIODE
+    if 'transistor' in component_type:
+        return _KIND_TRANSISTOR
+    if 'ic' in component_type or 'op_amp' in component_type:
+        return _KIND_IC
+    if 'gate' in component_type:
+        if 'and' in component_type:
+            return _KIND_AND_GATE
+        if 'or' in component_type:
+            return _KIND_OR_GATE
+    return _KIND_BLOCK
+
+
+def _generate_image_range(train_dir: Path, train_labels_dir: Path, draw_kind_ids: Tuple[int, ...],
+                          start: int, stop: int, rng, writer_threads: int, num_images: int,
+                          log_progress: bool = True) -> int:
+    """Generate and write synthetic images start..stop-1; rng is a Generator or a seed"""
+    rng = np.random.default_rng(rng)
+    
+    # FP32 scratch buffer reused for every background instead of fresh FP64 arrays
+    noise = np.empty((640, 640, 3), dtype=np.float32)
+    
+    # JPEG encoding and file writes go to worker threads (OpenCV releases the GIL
+    # while encoding); in-flight images are capped to bound memory
+    executor = ThreadPoolExecutor(max_workers=writer_threads, thread_name_prefix="dataset-writer")
+    pending = set()
+    
+    # Preallocated image buffers reused round-robin; a buffer is only refilled
+    # once the write still reading it has finished
+    buffers = [np.empty((640, 640, 3), dtype=np.uint8) for _ in range(writer_threads + 1)]
+    buffer_writes = [None] * len(buffers)
+    
+    # Per-component [class_id, x, y, w, h, LED colour] bounds (high exclusive)
+    param_low = [0, 50, 50, 20, 15, 0]
+    param_high = [len(draw_kind_ids), 590, 590, 80, 60, len(_LED_COLORS)]
+    
+    for i in range(start, stop):
+        slot = i % len(buffers)
+        if buffer_writes[slot] is not None:
+            buffer_writes[slot].result()
+        img = buffers[slot]
+        
+        # White circuit board background with some texture: clip(255 + 10*z, 0, 255).
+        # Clipping z to [-25.5, 0] first lets the final add store uint8 directly
+        rng.standard_normal(dtype=np.float32, out=noise)
+        np.clip(noise, -25.5, 0, out=noise)
+        noise *= 10
+        np.add(noise, 255, out=img, casting='unsafe')
+        
+        # Generate random circuit components: type, position and size in one RNG call
+        num_components = int(rng.integers(3, 10))
+        params = rng.integers(param_low, param_high, size=(num_components, 6))
+        class_ids = params[:, 0].tolist()
+        
+        # Draw component based on type
+        for class_id, x, y, w, h, color_index in params.tolist():
+            _draw(draw_kind_ids[class_id], img, x, y, w, h, color_index)
+        
+        # Create YOLO labels (normalized coordinates) for every component in one pass
+        xs, ys, ws, hs = params[:, 1:5].T
+        boxes = np.column_stack((xs + ws / 2, ys + hs / 2, ws, hs)) / 640
+        labels = [
+            _LABEL_FORMAT % (class_id, center_x, center_y, norm_w, norm_h)
+            for class_id, (center_x, center_y, norm_w, norm_h) in zip(class_ids, boxes.tolist())
+        ]
+        
+        if len(pending) >= 2 * writer_threads:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()
+        
+        # Save image
+        img_path = train_dir / f"circuit_{i:04d}.jpg"
+        buffer_writes[slot] = executor.submit(cv2.imwrite, str(img_path), img)
+        pending.add(buffer_writes[slot])
+        
+        # Save labels
+        label_path = train_labels_dir / f"circuit_{i:04d}.txt"
+        pending.add(executor.submit(label_path.write_text, '\n'.join(labels)))
+        
+        if log_progress and (i + 1) % 10 == 0:
+            logger.info(f"   Generated {i + 1}/{num_images} images")
+    
+    executor.shutdown(wait=True)
+    for future in pending:
+        future.result()
+    return stop - start
+
+
 class CircuitAITrainer:
     """
     Circuit-specific AI training pipeline that works with both YOLO and custom models
@@ -33,6 +256,8 @@ class CircuitAITrainer:
         self.config_dir.mkdir(exist_ok=True)
         
         self.circuit_classes = self._define_circuit_classes()
+        self._init_class_tables()
+        self._rng = np.random.default_rng()
         self.yolo_available = self._check_yolo_availability()
         
     def _define_circuit_classes(self) -> Dict[str, Dict[str, Any]]:
@@ -82,23 +307,45 @@ class CircuitAITrainer:
         
         return classes
     
+    def _init_class_tables(self):
+        """Flatten circuit_classes into per-id name and draw-kind tables"""
+        class_ids = sorted(self.circuit_classes.keys())
+        self._class_names = tuple(self.circuit_classes[i]['name'] for i in class_ids)
+        self._draw_kind_ids = tuple(_draw_kind(name) for name in self._class_names)
+    
     def _check_yolo_availability(self) -> bool:
         """Check if YOLO is available for training"""
-        try:
-            from ultralytics import YOLO
+        # find_spec avoids importing ultralytics (and torch) until training actually runs
+        if importlib.util.find_spec("ultralytics") is not None:
             return True
-        except ImportError:
-            logger.warning("⚠️ YOLO not available for training")
-            return False
+        logger.warning("⚠️ YOLO not available for training")
+        return False
     
     def create_yolo_dataset_config(self) -> str:
         """Create YOLO dataset configuration file"""
         
-        # Create class names list
-        class_names = [self.circuit_classes[i]['name'] for i in sorted(self.circuit_classes.keys())]
+        config_path = self.config_dir / "circuit_dataset.yaml"
+        cache_path = self.config_dir / "circuit_dataset.cache.json"
+        dataset_path = str(self.dataset_dir.absolute())
+        cache_key = {'names': list(self._class_names), 'path': dataset_path}
+        
+        # Same inputs and an untouched file since the last write: skip YAML emission entirely
+        try:
+            cached = json.loads(cache_path.read_text())
+            stat = config_path.stat()
+            if cached.get('key') == cache_key and cached.get('stat') == [stat.st_mtime_ns, stat.st_size]:
+                logger.info(f"✅ YOLO dataset config up to date: {config_path}")
+                return str(config_path)
+        except (OSError, ValueError):
+            pass
+        
+        if yaml is None:
+            raise ImportError("PyYAML is required to write the YOLO dataset config")
+        
+        class_names = list(self._class_names)
         
         config = {
-            'path': str(self.dataset_dir.absolute()),
+            'path': dataset_path,
             'train': 'images/train',
             'val': 'images/val',
             'test': 'images/test',
@@ -106,12 +353,17 @@ class CircuitAITrainer:
             'names': class_names
         }
         
-        config_path = self.config_dir / "circuit_dataset.yaml"
-        with open(config_path, 'w') as f:
-            import yaml
-            yaml.dump(config, f, default_flow_style=False)
+        config_text = yaml.dump(config, default_flow_style=False)
+        
+        # Leave an identical config untouched so its mtime (and YOLO's dataset cache) stays valid
+        if config_path.exists() and config_path.read_text() == config_text:
+            logger.info(f"✅ YOLO dataset config up to date: {config_path}")
+        else:
+            config_path.write_text(config_text)
+            logger.info(f"✅ YOLO dataset config created: {config_path}")
         
-        logger.info(f"✅ YOLO dataset config created: {config_path}")
+        stat = config_path.stat()
+        cache_path.write_text(json.dumps({'key': cache_key, 'stat': [stat.st_mtime_ns, stat.st_size]}))
         return str(config_path)
     
     def create_training_dataset_structure(self):
@@ -168,134 +420,35 @@ YOLO format: `class_id center_x center_y width height`
         train_dir = self.dataset_dir / "images" / "train"
         train_labels_dir = self.dataset_dir / "labels" / "train"
         
-        for i in range(num_images):
-            # Create blank circuit board background
-            img = np.ones((640, 640, 3), dtype=np.uint8) * 255
-            
-            # Add some circuit board texture
-            noise = np.random.normal(0, 10, (640, 640, 3))
-            img = np.clip(img + noise, 0, 255).astype(np.uint8)
-            
-            # Generate random circuit components
-            components = []
-            labels = []
-            
-            num_components = np.random.randint(3, 10)
-            
-            for j in range(num_components):
-                # Random component type
-                class_id = np.random.randint(0, len(self.circuit_classes))
-                
-                # Random position and size
-                x = np.random.randint(50, 590)
-                y = np.random.randint(50, 590)
-                w = np.random.randint(20, 80)
-                h = np.random.randint(15, 60)
-                
-                # Draw component based on type
-                component_name = self.circuit_classes[class_id]['name']
-                self._draw_component(img, component_name, x, y, w, h)
-                
-                # Create YOLO label (normalized coordinates)
-                center_x = (x + w/2) / 640
-                center_y = (y + h/2) / 640
-                norm_w = w / 640
-                norm_h = h / 640
-                
-                labels.append(f"{class_id} {center_x:.6f} {center_y:.6f} {norm_w:.6f} {norm_h:.6f}")
-            
-            # Save image
-            img_path = train_dir / f"circuit_{i:04d}.jpg"
-            cv2.imwrite(str(img_path), img)
-            
-            # Save labels
-            label_path = train_labels_dir / f"circuit_{i:04d}.txt"
-            with open(label_path, 'w') as f:
-                f.write('\n'.join(labels))
-            
-            if (i + 1) % 10 == 0:
-                logger.info(f"   Generated {i + 1}/{num_images} images")
+        # Images are independent, so large runs are split across processes (drawing is
+        # Python-call bound and only processes escape the GIL); small runs stay in-process
+        processes = int(os.environ.get("SYNTH_WORKERS", "0")) or min(
+            os.cpu_count() or 1, num_images // _MIN_IMAGES_PER_PROCESS)
+        
+        if processes <= 1:
+            _generate_image_range(train_dir, train_labels_dir, self._draw_kind_ids, 0, num_images,
+                                  self._rng, os.cpu_count() or 4, num_images)
+        else:
+            bounds = np.linspace(0, num_images, processes + 1).astype(int).tolist()
+            seeds = self._rng.integers(0, 2**63, size=processes).tolist()
+            writer_threads = max(1, (os.cpu_count() or 1) // processes)
+            with ProcessPoolExecutor(max_workers=processes,
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = [
+                    pool.submit(_generate_image_range, train_dir, train_labels_dir, self._draw_kind_ids,
+                                start, stop, seed, writer_threads, num_images, False)
+                    for start, stop, seed in zip(bounds, bounds[1:], seeds)
+                ]
+                generated = 0
+                for future in as_completed(futures):
+                    generated += future.result()
+                    logger.info(f"   Generated {generated}/{num_images} images")
         
         logger.info(f"✅ Synthetic dataset generation complete")
     
     def _draw_component(self, img: np.ndarray, component_type: str, x: int, y: int, w: int, h: int):
         """Draw a circuit component on the image"""
-        
-        if 'resistor' in component_type:
-            # Draw resistor as rectangle with zigzag
-            cv2.rectangle(img, (x, y), (x+w, y+h), (139, 69, 19), 2)
-            # Add color bands
-            band_width = w // 5
-            colors = [(255, 0, 0), (255, 255, 0), (0, 255, 0)]
-            for i, color in enumerate(colors):
-                cv2.rectangle(img, 
-                             (x + i*band_width, y), 
-                             (x + (i+1)*band_width, y+h), 
-                             color, -1)
-        
-        elif 'capacitor' in component_type:
-            if 'polarized' in component_type:
-                # Cylindrical capacitor
-                cv2.rectangle(img, (x, y), (x+w, y+h), (0, 0, 0), 2)
-                # Add polarity marking
-                cv2.putText(img, '+', (x+5, y+h-5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-            else:
-                # Ceramic capacitor
-                cv2.rectangle(img, (x, y), (x+w, y+h), (255, 255, 0), -1)
-                cv2.rectangle(img, (x, y), (x+w, y+h), (0, 0, 0), 1)
-        
-        elif 'inductor' in component_type:
-            # Draw coil shape
-            center_x = x + w//2
-            center_y = y + h//2
-            for i in range(3):
-                cv2.circle(img, (center_x - w//4 + i*w//4, center_y), h//4, (150, 75, 0), 2, lineType=cv2.LINE_AA)
-        
-        elif 'diode' in component_type or 'led' in component_type:
-            # Triangle with line
-            cv2.line(img, (x, y+h//2), (x+w//2, y), (0, 0, 0), 2)
-            cv2.line(img, (x+w//2, y), (x+w//2, y+h), (0, 0, 0), 2)
-            cv2.line(img, (x+w//2, y+h), (x, y+h//2), (0, 0, 0), 2)
-            cv2.line(img, (x+w//2, y), (x+w, y+h//2), (0, 0, 0), 2)
-            
-            if 'led' in component_type:
-                # Add LED color
-                colors = [(0, 0, 255), (0, 255, 0), (255, 0, 0), (0, 255, 255)]
-                color = colors[np.random.randint(0, len(colors))]
-                cv2.circle(img, (x+w//2, y+h//2), min(w, h)//4, color, -1)
-        
-        elif 'transistor' in component_type:
-            # Simple transistor shape
-            cv2.circle(img, (x+w//2, y+h//2), min(w, h)//2, (0, 0, 0), 2)
-            cv2.line(img, (x, y+h//2), (x+w, y+h//2), (0, 0, 0), 2)
-        
-        elif 'ic' in component_type or 'op_amp' in component_type:
-            # DIP package
-            cv2.rectangle(img, (x, y), (x+w, y+h), (50, 50, 50), -1)
-            cv2.rectangle(img, (x, y), (x+w, y+h), (0, 0, 0), 2)
-            # Add pins
-            pin_spacing = h // 8
-            for i in range(4):
-                cv2.circle(img, (x, y + pin_spacing * (i+2)), 2, (200, 200, 200), -1)
-                cv2.circle(img, (x+w, y + pin_spacing * (i+2)), 2, (200, 200, 200), -1)
-        
-        elif 'gate' in component_type:
-            if 'and' in component_type:
-                # AND gate - D shape
-                cv2.ellipse(img, (x+w//2, y+h//2), (w//2, h//2), 0, -90, 90, (0, 0, 0), 2)
-                cv2.line(img, (x, y), (x, y+h), (0, 0, 0), 2)
-            elif 'or' in component_type:
-                # OR gate - curved input
-                cv2.ellipse(img, (x+w//2, y+h//2), (w//2, h//2), 0, 0, 360, (0, 0, 0), 2)
-            else:
-                # Generic gate
-                cv2.rectangle(img, (x, y), (x+w, y+h), (128, 128, 128), -1)
-                cv2.rectangle(img, (x, y), (x+w, y+h), (0, 0, 0), 2)
-        
-        else:
-            # Default component
-            cv2.rectangle(img, (x, y), (x+w, y+h), (128, 128, 128), -1)
-            cv2.rectangle(img, (x, y), (x+w, y+h), (0, 0, 0), 2)
+        _draw(_draw_kind(component_type), img, x, y, w, h, int(self._rng.integers(len(_LED_COLORS))))
     
     def train_yolo_model(self, epochs: int = 50) -> str:
         """Train YOLO model on circuit dataset"""
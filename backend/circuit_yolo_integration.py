@@ -17,6 +17,9 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# YOLO classes that are never circuit components
+NON_CIRCUIT_TYPES = frozenset({'operator', 'test_equipment', 'mobile_device', 'unknown_object'})
+
 class CircuitYOLOIntegration:
     """
     Integrated YOLO + Circuitry AI system for circuit component detection
@@ -452,24 +455,18 @@ class CircuitYOLOIntegration:
             )
             
             if lines is not None:
-                for i, line in enumerate(lines):
-                    try:
-                        # Handle different line formats
-                        if len(line) == 4:
-                            x1, y1, x2, y2 = line
-                        else:
-                            x1, y1, x2, y2 = line[0]
-                    except (ValueError, IndexError):
-                        continue
-                    
-                    # Calculate line properties
-                    length = np.sqrt((x2-x1)**2 + (y2-y1)**2)
-                    angle = np.degrees(np.arctan2(y2-y1, x2-x1))
-                    
+                # Geometry for every segment at once instead of per-line scalar numpy calls
+                segments = lines.reshape(-1, 4)
+                dx = segments[:, 2] - segments[:, 0]
+                dy = segments[:, 3] - segments[:, 1]
+                lengths = np.hypot(dx, dy).tolist()
+                angles = np.degrees(np.arctan2(dy, dx)).tolist()
+                
+                for (x1, y1, x2, y2), length, angle in zip(segments.tolist(), lengths, angles):
                     connection = {
                         'type': 'wire',
-                        'start_point': [int(x1), int(y1)],
-                        'end_point': [int(x2), int(y2)],
+                        'start_point': [x1, y1],
+                        'end_point': [x2, y2],
                         'length': length,
                         'angle': angle,
                         'confidence': 0.8
@@ -546,16 +543,18 @@ class CircuitYOLOIntegration:
         """Filter and enhance detections to identify actual circuit components"""
         circuit_components = []
         
+        circuit_info_for = self.circuit_components.get
+        
         for detection in detections:
             component_type = detection.get('type', 'unknown')
             
             # Filter out non-circuit objects
-            if component_type in ['operator', 'test_equipment', 'mobile_device', 'unknown_object']:
+            if component_type in NON_CIRCUIT_TYPES:
                 continue
             
             # Enhance with circuit component information
-            if component_type in self.circuit_components:
-                circuit_info = self.circuit_components[component_type]
+            circuit_info = circuit_info_for(component_type)
+            if circuit_info is not None:
                 detection.update({
                     'category': circuit_info.get('category', 'unknown'),
                     'symbol': circuit_info.get('symbol', '?'),
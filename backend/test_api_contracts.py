@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+API contract tests - request validation and response shapes, run in-process
+"""
+
+import json
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_null_or_mistyped_fields_are_rejected():
+    """analysis / context must be objects when present: null or other types get 422"""
+    print("🔍 Testing request validation...")
+    for payload in ({"netlist": "R1 1 0 1k", "analysis": None},
+                    {"netlist": "R1 1 0 1k", "analysis": "dc"}):
+        assert client.post("/api/simulate", json=payload).status_code == 422
+    for endpoint in ("/api/chat", "/api/chat/stream"):
+        for context in (None, ["netlist"]):
+            response = client.post(endpoint, json={"question": "hi", "context": context})
+            assert response.status_code == 422
+    print("✅ Invalid fields rejected with 422")
+
+
+def test_omitted_fields_use_defaults():
+    """Leaving analysis / context out still falls back to their defaults"""
+    assert client.post("/api/simulate", json={"netlist": "R1 1 0 1k"}).status_code == 200
+    assert client.post("/api/chat", json={"question": "hi"}).status_code == 200
+
+
+def test_non_string_analysis_type_is_echoed_as_text():
+    """analysis is free-form, so a numeric or null type must not break the response model"""
+    for analysis_type in (3, None):
+        response = client.post("/api/simulate", json={"netlist": "R1 1 0 1k", "analysis": {"type": analysis_type}})
+        assert response.status_code == 200
+        assert isinstance(response.json()["simulation_metadata"]["analysis_type"], str)
+
+
+def _transient_result(netlist, analysis):
+    time_axis = [i * 1e-6 for i in range(1000)]
+    return {
+        "status": "success",
+        "type": "tran",
+        "message": "ok",
+        "results": {"time": time_axis, "voltages": {"N1": [5.0] * 1000, "N2": [2.5] * 1000}},
+        "netlist": netlist
+    }
+
+
+def test_streamed_simulation_matches_plain_response():
+    """Large results are streamed with the same body, key order included, as the plain response"""
+    print("🔍 Testing streamed simulation output...")
+    original = (main.simulate_netlist_async, main._STREAM_MIN_POINTS)
+
+    async def fake_simulate(netlist, analysis):
+        return _transient_result(netlist, analysis)
+
+    payload = {"netlist": "V1 1 0 5\nR1 1 2 1k\nR2 2 0 1k", "analysis": {"type": "tran", "streamed_test": True}}
+    try:
+        main.simulate_netlist_async = fake_simulate
+        main._STREAM_MIN_POINTS = 10 ** 9
+        plain = client.post("/api/simulate", json=payload)
+        main._STREAM_MIN_POINTS = 1000
+        streamed = client.post("/api/simulate", json=payload)
+    finally:
+        main.simulate_netlist_async, main._STREAM_MIN_POINTS = original
+
+    assert "content-length" in plain.headers and "content-length" not in streamed.headers
+    plain_body, streamed_body = plain.json(), json.loads(streamed.content)
+    for body in (plain_body, streamed_body):
+        for key in ("processing_time_ms", "timestamp"):
+            body["simulation_metadata"].pop(key)
+    assert list(streamed_body) == list(plain_body)
+    assert streamed_body == plain_body
+    print("✅ Streamed body matches the plain response")
+
+
+if __name__ == "__main__":
+    test_null_or_mistyped_fields_are_rejected()
+    test_omitted_fields_use_defaults()
+    test_non_string_analysis_type_is_echoed_as_text()
+    test_streamed_simulation_matches_plain_response()
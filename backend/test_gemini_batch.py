@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Batched Gemini parsing test - one multi-image request, per-image fallback on a bad reply
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from app import image_parser
+
+
+class _FakeModels:
+    """Stand-in for client.aio.models: answers batched calls with `batch_reply`"""
+
+    def __init__(self, batch_reply):
+        self.batch_reply = batch_reply
+        self.calls = []
+
+    async def generate_content(self, model, contents, config=None):
+        images = len(contents) - 1
+        self.calls.append(images)
+        if images > 1:
+            return SimpleNamespace(text=json.dumps(self.batch_reply(images)))
+        return SimpleNamespace(text=json.dumps({"components": [{"name": "single"}], "nets": []}))
+
+
+def _circuit(i):
+    return {"components": [{"name": f"R{i}"}], "nets": ["N1", "0"]}
+
+
+def _write_images(directory, count, seed):
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"img{i}.png")
+        cv2.imwrite(path, np.full((16, 16, 3), seed + i, dtype=np.uint8))
+        paths.append(path)
+    return paths
+
+
+def _run(models, paths):
+    original = (image_parser.API_KEY, image_parser.get_client)
+    image_parser.API_KEY = "test"
+    image_parser.get_client = lambda: SimpleNamespace(aio=SimpleNamespace(models=models))
+    try:
+        return asyncio.run(image_parser.parse_images_via_gemini_original_async(paths))
+    finally:
+        image_parser.API_KEY, image_parser.get_client = original
+
+
+def test_images_share_one_request():
+    """All images go out in one generate_content call, results come back in order"""
+    print("🔍 Testing batched Gemini request...")
+    models = _FakeModels(lambda n: [_circuit(i) for i in range(n)])
+    with tempfile.TemporaryDirectory() as directory:
+        results = _run(models, _write_images(directory, 3, seed=10))
+
+    assert models.calls == [3]
+    assert [r["components"][0]["name"] for r in results] == ["R0", "R1", "R2"]
+    assert all(r["components"][0]["confidence"] == 0.8 for r in results)
+    print("✅ One request for three images")
+
+
+def test_length_mismatch_falls_back_per_image():
+    """A reply with the wrong number of circuits is discarded for per-image calls"""
+    print("🔍 Testing per-image fallback...")
+    models = _FakeModels(lambda n: [_circuit(0)])
+    with tempfile.TemporaryDirectory() as directory:
+        results = _run(models, _write_images(directory, 3, seed=40))
+
+    assert models.calls == [3, 1, 1, 1]
+    assert [r["components"][0]["name"] for r in results] == ["single"] * 3
+    print("✅ Mismatched reply fell back to per-image requests")
+
+
+def test_empty_input():
+    assert _run(_FakeModels(lambda n: []), []) == []
+
+
+if __name__ == "__main__":
+    test_images_share_one_request()
+    test_length_mismatch_falls_back_per_image()
+    test_empty_input()
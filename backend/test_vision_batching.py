@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+YOLO batching test - batched detection must match one-image-at-a-time detection
+"""
+
+import numpy as np
+
+from app import vision_processor
+from app.vision_processor import VisionProcessor
+
+
+class _FakeData:
+    def __init__(self, array):
+        self.array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class _FakeBoxes:
+    def __init__(self, array):
+        self.data = _FakeData(array)
+
+
+class _FakeResult:
+    def __init__(self, array):
+        self.boxes = _FakeBoxes(array)
+
+
+class _FakeYOLO:
+    """Stand-in model: one box per image, derived from the image's fill value"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, source, batch=1):
+        assert batch <= vision_processor._YOLO_MAX_BATCH
+        self.batch_sizes.append(len(source))
+        results = []
+        for image in source:
+            v = float(image[0, 0, 0])
+            results.append(_FakeResult(np.array([[v, v, v + 10, v + 20, 0.5, v % 10]])))
+        return results
+
+
+def _processor(model):
+    processor = VisionProcessor.__new__(VisionProcessor)
+    processor.yolo_model = model
+    processor.gemini_client = None
+    return processor
+
+
+def test_batch_matches_single_images():
+    """Batches larger than the engine limit are split and keep per-image results"""
+    print("🔍 Testing batched YOLO detection...")
+    images = [np.full((8, 8, 3), i, dtype=np.uint8) for i in range(vision_processor._YOLO_MAX_BATCH * 2 + 3)]
+
+    model = _FakeYOLO()
+    batched = _processor(model).detect_components_yolo_batch(images)
+    singles = [_processor(_FakeYOLO()).detect_components_yolo("unused.png", image) for image in images]
+
+    assert batched == singles
+    assert max(model.batch_sizes) == vision_processor._YOLO_MAX_BATCH
+    assert sum(model.batch_sizes) == len(images)
+    print("✅ Batched detection matches single-image detection")
+
+
+if __name__ == "__main__":
+    test_batch_matches_single_images()